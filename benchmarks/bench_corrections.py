@@ -0,0 +1,50 @@
+"""
+Measure suggest_corrections() on synthetic VINs with one defect each (a
+wrong check digit, or an I, O or Q), and how often the VIN before the
+defect was introduced is among the suggestions, and first.
+
+Usage: python benchmarks/bench_corrections.py [count]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.corrections import suggest_many
+from libvin.synth import generate
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    originals, _ = generate(count, seed=1)
+    # Damage one random character of each: OCR-style for letters and
+    # digits that have a look-alike, otherwise a random character
+    rng = np.random.RandomState(2)
+    lookalike = {'0': 'O', '1': 'I', '8': 'B', '5': 'S', '2': 'Z', '6': 'G',
+                 'B': '8', 'S': '5', 'Z': '2', 'G': '6', 'D': '0'}
+    alphabet = '0123456789ABCDEFGHJKLMNPRSTUVWXYZ'
+    originals = [vin.decode('ascii') for vin in originals.tolist()]
+    damaged = []
+    for vin in originals:
+        position = rng.randint(17)
+        c = lookalike.get(vin[position]) or alphabet[rng.randint(len(alphabet))]
+        damaged.append(vin[:position] + c + vin[position + 1:])
+
+    start = time.time()
+    suggestions = suggest_many(damaged)
+    elapsed = time.time() - start
+
+    found = sum(vin in s for vin, s in zip(originals, suggestions))
+    first = sum(bool(s) and s[0] == vin for vin, s in zip(originals, suggestions))
+    print("%d VINs in %.1fs (%.0f per second)" % (count, elapsed, count / elapsed))
+    print("suggestions per VIN: %.1f" % (sum(len(s) for s in suggestions) / float(count)))
+    print("original suggested: %.1f%%, first: %.1f%%"
+          % (100.0 * found / count, 100.0 * first / count))
+
+
+if __name__ == '__main__':
+    main()
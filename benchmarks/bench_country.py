@@ -0,0 +1,78 @@
+"""
+Compare the compiled country/region tables against scanning the range
+strings in WORLD_MANUFACTURER_MAP, as Vin.country used to.
+
+Usage: python benchmarks/bench_country.py [count]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.decoding import Vin
+from libvin.static import WORLD_MANUFACTURER_MAP
+from libvin.tables import COUNTRIES, REGIONS, WMI_CHARS
+
+
+def scan_country(vin):
+    countries = WORLD_MANUFACTURER_MAP[vin[0]]['countries']
+    for codes in countries:
+        if vin[1] in codes:
+            return countries[codes]
+    return 'Unknown'
+
+
+def scan_region(vin):
+    return WORLD_MANUFACTURER_MAP[vin[0]]['region']
+
+
+def table_country(vin):
+    return COUNTRIES.get(vin[:2], 'Unknown')
+
+
+def table_region(vin):
+    return REGIONS[vin[0]]
+
+
+def noop(vin):
+    pass
+
+
+def per_call(func, vins):
+    start = time.time()
+    for vin in vins:
+        func(vin)
+    return (time.time() - start) / len(vins) * 1e9
+
+
+def lookup_cost(func, vins):
+    """
+    Returns the time per call spent in func itself, excluding the loop
+    and call overhead.
+    """
+    return per_call(func, vins) - per_call(noop, vins)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(0)
+    firsts = sorted(WORLD_MANUFACTURER_MAP)
+    vins = [rng.choice(firsts) + rng.choice(WMI_CHARS) + 'KEV13728J123735'
+            for i in range(count)]
+
+    assert [scan_country(vin) for vin in vins] == [Vin(vin).country for vin in vins]
+
+    for name, before, after in [
+            ('country', scan_country, table_country),
+            ('region', scan_region, table_region)]:
+        old = lookup_cost(before, vins)
+        new = lookup_cost(after, vins)
+        print("%-8s scan %6.1f ns/call, table %6.1f ns/call (%.1fx)"
+              % (name, old, new, old / new))
+
+
+if __name__ == '__main__':
+    main()
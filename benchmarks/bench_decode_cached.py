@@ -0,0 +1,75 @@
+"""
+Decode a stream of messages in which the same VINs recur, as from a
+telematics feed, with a new Vin per message and with decode_cached().
+
+Usage: python benchmarks/bench_decode_cached.py [messages] [vehicles]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from suite import make_corpus
+from libvin.decoding import Vin, decode_cache, decode_cached
+
+FIELDS = ('country', 'manufacturer', 'make', 'year', 'is_valid')
+
+
+def stream(messages, vehicles, seed=1):
+    """
+    Returns messages VINs drawn from vehicles distinct ones, the Nth
+    most frequent sending about 1/N as many messages as the first.
+    """
+    fleet = make_corpus(vehicles, seed)
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(vehicles)]
+    total = sum(weights)
+    counts = [max(1, int(messages * weight / total)) for weight in weights]
+    vins = [vin for vin, count in zip(fleet, counts) for _ in range(count)]
+    rng.shuffle(vins)
+    return vins
+
+
+def decode_each(vins):
+    for vin in vins:
+        v = Vin(vin)
+        for field in FIELDS:
+            getattr(v, field)
+
+
+def decode_each_cached(vins):
+    for vin in vins:
+        record = decode_cached(vin)
+        for field in FIELDS:
+            getattr(record, field)
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    vehicles = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    vins = stream(messages, vehicles)
+
+    start = time.time()
+    decode_each(vins)
+    plain = time.time() - start
+
+    decode_cache.clear()
+    start = time.time()
+    decode_each_cached(vins)
+    cached = time.time() - start
+
+    stats = decode_cache.stats()
+    footprint = decode_cache.footprint()
+    print("%d messages from %d vehicles" % (len(vins), vehicles))
+    print("new Vin each:  %.2fs (%.0f per second)" % (plain, len(vins) / plain))
+    print("decode_cached: %.2fs (%.0f per second), %.1fx" % (
+        cached, len(vins) / cached, plain / cached))
+    print("hit ratio %.3f, %d records, %.1f MB, %d bytes per record" % (
+        stats.hit_ratio, stats.size, footprint / 1e6, footprint / stats.size))
+
+
+if __name__ == '__main__':
+    main()
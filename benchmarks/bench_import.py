@@ -0,0 +1,60 @@
+"""
+Measure how long a fresh interpreter takes to import libvin for offline
+decoding, and for NHTSA lookups, and whether requests gets imported.
+Each import is timed in a new process, with bytecode caching enabled,
+and the best of several runs is reported.
+
+For a per-module breakdown on Python 3.7 and later, run:
+
+    python -X importtime -c 'import libvin.decoding'
+
+Usage: python benchmarks/bench_import.py [runs]
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CASES = [
+    ('import libvin', 'import libvin'),
+    ('offline Vin decoding', 'import libvin\n'
+                             'from libvin.decoding import Vin\n'
+                             "Vin('1GKEV13728J123735').make"),
+    ('import libvin.nhtsa', 'import libvin.nhtsa'),
+]
+
+TIMER = '''
+import sys, time, warnings
+warnings.simplefilter('ignore')
+start = time.time()
+%s
+sys.stdout.write('%%f %%d' %% (time.time() - start, 'requests' in sys.modules))
+'''
+
+
+def run(code):
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    output = subprocess.check_output([sys.executable, '-c', TIMER % code],
+                                     cwd=ROOT, env=env)
+    elapsed, requests = output.decode('ascii').split()
+    return float(elapsed), requests == '1'
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print("%-22s %8s  %s" % ('case', 'ms', 'imports requests'))
+    for name, code in CASES:
+        # The first run writes the bytecode cache
+        run(code)
+        times = []
+        for _ in range(runs):
+            elapsed, requests = run(code)
+            times.append(elapsed)
+        print("%-22s %8.1f  %s" % (name, 1e3 * min(times), requests))
+
+
+if __name__ == '__main__':
+    main()
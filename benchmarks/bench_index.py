@@ -0,0 +1,77 @@
+"""
+Time VinIndex queries against scanning every VIN with Vin, over a
+synthetic inventory, and loading a saved index memory-mapped.
+
+Usage: python benchmarks/bench_index.py [count]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.decoding import Vin
+from libvin.index import VinIndex
+from libvin.synth import generate
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        result = func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    array, _ = generate(count, seed=1)
+    vins = [vin.decode('ascii') for vin in array.tolist()]
+    wmi = vins[0][:3]
+    pattern = vins[0][:4] + '?' + vins[0][5]
+
+    index, build = timed(lambda: VinIndex.build(array), 1)
+    print("%d VINs: built in %.2fs, %d bytes per VIN" % (
+        count, build, index.packed.nbytes // len(index)))
+
+    queries = [
+        ("WMI %s, 2008" % wmi,
+         lambda: index.count(wmi, 2008, 2008),
+         lambda: sum(1 for vin in vins if vin[:3] == wmi and Vin(vin).year == 2008)),
+        ("pattern %s" % pattern,
+         lambda: index.count(pattern),
+         lambda: sum(1 for vin in vins if vin[:4] == pattern[:4] and vin[5] == pattern[5])),
+        ("2000-2005, any WMI",
+         lambda: index.count(first_year=2000, last_year=2005),
+         lambda: sum(1 for vin in vins if 2000 <= Vin(vin).year <= 2005)),
+    ]
+    print("%-28s %8s %12s %12s" % ('query', 'matches', 'index ms', 'scan ms'))
+    for name, query, scan in queries:
+        found, query_time = timed(query)
+        expected, scan_time = timed(scan, 1)
+        assert found == expected
+        print("%-28s %8d %12.2f %12.0f" % (name, found, query_time * 1e3, scan_time * 1e3))
+
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'index.npy')
+        index.save(path)
+        start = time.time()
+        loaded = VinIndex.load(path)
+        load_time = time.time() - start
+        loaded.count(wmi, 2008, 2008)
+        first_query = time.time() - start - load_time
+        print("load memory-mapped: %.2f ms, first query %.2f ms" % (
+            load_time * 1e3, first_query * 1e3))
+        del loaded
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Time is_valid_vin against the check Vin.is_valid made before it, on
+valid VINs, VINs with an illegal character early on, and VINs with a
+wrong check digit, as strings and as bytes.
+
+Usage: python benchmarks/bench_is_valid.py [count]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.decoding import is_valid_vin
+from libvin.static import VIN_TRANSLATION, VIN_WEIGHT
+from tests import TEST_DATA
+
+
+def old_is_valid(vin):
+    """
+    Vin.is_valid's checks before is_valid_vin, with the upper() Vin did.
+    """
+    vin = vin.upper()
+    if len(vin) != 17:
+        return False
+    if any(x in 'IOQ' for x in vin):
+        return False
+    if vin[9] in 'UZ0':
+        return False
+    products = [VIN_WEIGHT[i] * VIN_TRANSLATION[j] for i, j in enumerate(vin)]
+    check_digit = sum(products) % 11
+    if check_digit == 10:
+        check_digit = 'X'
+    return vin[8] == str(check_digit)
+
+
+def timed(func, vins):
+    best = None
+    for _ in range(3):
+        start = time.time()
+        for vin in vins:
+            func(vin)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(vins) * 1e9
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    base = [test['VIN'] for test in TEST_DATA]
+    valid = (base * (count // len(base) + 1))[:count]
+    corpora = [
+        ('valid', valid),
+        ('invalid early', ['I' + vin[1:] for vin in valid]),
+        ('invalid checksum',
+         [vin[:8] + ('0' if vin[8] != '0' else '1') + vin[9:] for vin in valid]),
+    ]
+
+    print("%-18s %12s %12s %12s" % ('ns per VIN', 'old', 'str', 'bytes'))
+    for name, vins in corpora:
+        encoded = [vin.encode('ascii') for vin in vins]
+        assert [is_valid_vin(vin) for vin in vins] == [old_is_valid(vin) for vin in vins]
+        print("%-18s %12.0f %12.0f %12.0f" % (name, timed(old_is_valid, vins),
+                                              timed(is_valid_vin, vins),
+                                              timed(is_valid_vin, encoded)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Compare the WMI table libvin.tables builds at import with a
+MappedWmiTable file, both for the current WMI_MAP and for a synthetic
+table the size of the full SAE list: time to get a usable table, and
+time per lookup.
+
+Usage: python benchmarks/bench_mapped.py [synthetic WMIs]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.mapped import MappedWmiTable, write_wmi_table
+from libvin.tables import WMI_CHARS, compile_wmis
+
+
+def synthetic_wmis(count, rng):
+    wmis = {}
+    while len(wmis) < count:
+        wmi = ''.join(rng.choice(WMI_CHARS) for _ in range(3))
+        name = 'Manufacturer %d' % rng.randrange(count // 5)
+        wmis[wmi] = (name, name, None)
+    return wmis
+
+
+def measure(name, wmis, tmp):
+    path = os.path.join(tmp, name + '.table')
+    write_wmi_table(path, wmis)
+    items = list(wmis.items())
+    keys = [wmi for wmi, _ in items[:1000]]
+
+    build = min(timeit.repeat(lambda: dict(items), number=1, repeat=5))
+    load = min(timeit.repeat(lambda: MappedWmiTable(path), number=1, repeat=5))
+    table = MappedWmiTable(path)
+    dict_get = min(timeit.repeat(lambda: [wmis.get(k) for k in keys], number=10, repeat=3))
+    mapped_get = min(timeit.repeat(lambda: [table.get(k) for k in keys], number=10, repeat=3))
+    table.close()
+    print("%-10s %6d  %8.2f ms  %8.2f ms  %7.2f us  %7.2f us  %7d" % (
+        name, len(wmis), 1e3 * build, 1e3 * load, 1e2 * dict_get, 1e2 * mapped_get,
+        os.path.getsize(path)))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    tmp = tempfile.mkdtemp()
+    print("table        WMIs  dict build  mmap open  dict get  mmap get  file bytes")
+    try:
+        measure('static', compile_wmis(), tmp)
+        measure('synthetic', synthetic_wmis(count, random.Random(1)), tmp)
+    finally:
+        shutil.rmtree(tmp)
+    print("(dict build excludes compiling WMI_MAP itself; compile_wmis() takes %.2f ms)"
+          % (1e3 * min(timeit.repeat(compile_wmis, number=1, repeat=5))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Measure AsyncNhtsaClient throughput against a local stub of the vPIC API
+that takes 20ms to answer each request, at 1, 10 and 100 concurrent
+requests.  Needs Python 3.6 or later.
+
+Usage: python3 benchmarks/bench_nhtsa_async.py [count]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.nhtsa_async import AsyncNhtsaClient
+from tests import TEST_DATA
+from tests.nhtsa_stub import StubServer
+
+
+async def run(client, vins):
+    start = time.time()
+    await asyncio.gather(*[client.decode(vin) for vin in vins])
+    single = len(vins) / (time.time() - start)
+
+    start = time.time()
+    await client.decode_batch(vins)
+    batch = len(vins) / (time.time() - start)
+    return single, batch
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    base = [test['VIN'] for test in TEST_DATA]
+    vins = (base * (count // len(base) + 1))[:count]
+    server = StubServer(delay=0.02)
+
+    print("concurrency  decode VINs/sec  decode_batch VINs/sec")
+    try:
+        for concurrency in (1, 10, 100):
+            client = AsyncNhtsaClient(concurrency=concurrency, base_url=server.url)
+            loop = asyncio.new_event_loop()
+            try:
+                single, batch = loop.run_until_complete(run(client, vins))
+            finally:
+                client.close()
+                loop.close()
+            print("%11d  %15.0f  %21.0f" % (concurrency, single, batch))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Count the vPIC requests NhtsaClient.decode_batch makes for a fleet of
+VINs, made by giving the test VINs random serial numbers, decoded twice:
+without a cache, with an NhtsaCache keyed on VINs, and with one keyed
+on patterns, and with and without collapsing VINs with the same pattern
+into one lookup.  Also times cache lookups.
+
+Usage: python benchmarks/bench_nhtsa_cache.py [count]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.nhtsa import NhtsaClient
+from libvin.nhtsa_cache import NhtsaCache
+from libvin.static import VIN_TRANSLATION, VIN_WEIGHT
+from tests import TEST_DATA
+from tests.nhtsa_stub import StubServer
+
+
+def with_serial(vin, serial):
+    vin = vin[:11] + '%06d' % serial
+    check = sum(VIN_WEIGHT[i] * VIN_TRANSLATION[c] for i, c in enumerate(vin)) % 11
+    return vin[:8] + ('X' if check == 10 else str(check)) + vin[9:]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(1)
+    base = [test['VIN'] for test in TEST_DATA]
+    vins = [with_serial(rng.choice(base), rng.randrange(1000000)) for _ in range(count)]
+    server = StubServer()
+
+    print("cache    by_pattern  requests  saved  hits")
+    try:
+        for name, cache, by_pattern in (('none', None, False),
+                                        ('none', None, True),
+                                        ('vin', NhtsaCache(), False),
+                                        ('pattern', NhtsaCache(by_pattern=True), True)):
+            client = NhtsaClient(server.url, cache=cache, by_pattern=by_pattern)
+            client.decode_batch(vins)
+            client.decode_batch(vins)
+            client.close()
+            print("%-8s %10s %9d %6d  %3.0f%%" % (
+                name, by_pattern, client.requests_made, client.lookups_saved,
+                100.0 * cache.hits / (2 * count) if cache else 0))
+    finally:
+        server.stop()
+
+    cache = NhtsaCache()
+    cache.put_many((vin, {'VIN': vin, 'Make': 'X'}) for vin in vins)
+    start = time.time()
+    cache.get_many(vins)
+    elapsed = time.time() - start
+    print("get_many: %.1f us per VIN" % (1e6 * elapsed / count))
+    start = time.time()
+    for vin in vins[:2000]:
+        cache.get(vin)
+    elapsed = time.time() - start
+    print("get: %.1f us per VIN" % (1e6 * elapsed / 2000))
+
+
+if __name__ == '__main__':
+    main()
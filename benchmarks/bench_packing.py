@@ -0,0 +1,67 @@
+"""
+Memory and speed of packed VINs against VIN strings: bytes per VIN held
+in a set as strings, ints and 11 byte strings, and in NumPy arrays as
+S17 and PACKED_DTYPE, with the time to pack, unpack, sort and
+deduplicate them.
+
+Usage: python benchmarks/bench_packing.py [count]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from libvin.batch import pack_many, unpack_many
+from libvin.packing import pack_vin, pack_vin_bytes, unpack_vin
+from libvin.synth import generate
+
+
+def set_bytes(values):
+    """
+    Returns the bytes per value held by a set of values, counting the
+    values themselves.
+    """
+    held = set(values)
+    return (sys.getsizeof(held) + sum(sys.getsizeof(v) for v in held)) / float(len(held))
+
+
+def timed(func):
+    start = time.time()
+    result = func()
+    return result, time.time() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    array, _ = generate(count, seed=1)
+    vins = [vin.decode('ascii') for vin in array.tolist()]
+
+    ints, pack_time = timed(lambda: [pack_vin(vin) for vin in vins])
+    _, unpack_time = timed(lambda: [unpack_vin(n) for n in ints])
+    packed_bytes = [pack_vin_bytes(vin) for vin in vins]
+    print("in a set, bytes per VIN: str %.0f, int %.0f, 11 bytes %.0f" % (
+        set_bytes(vins), set_bytes(ints), set_bytes(packed_bytes)))
+    print("pack_vin %.0f ns, unpack_vin %.0f ns per VIN" % (
+        pack_time / count * 1e9, unpack_time / count * 1e9))
+
+    packed, pack_time = timed(lambda: pack_many(array))
+    _, unpack_time = timed(lambda: unpack_many(packed))
+    print("arrays, bytes per VIN: S17 %d, packed %d" % (array.itemsize, packed.itemsize))
+    print("pack_many %.0f ns, unpack_many %.0f ns per VIN" % (
+        pack_time / count * 1e9, unpack_time / count * 1e9))
+    _, text_sort = timed(lambda: np.sort(array))
+    _, packed_sort = timed(lambda: np.sort(packed))
+    _, raw_sort = timed(lambda: np.sort(packed.view('S12')))
+    print("sort: S17 %.2fs, packed %.2fs, packed as S12 %.2fs" % (
+        text_sort, packed_sort, raw_sort))
+    _, text_unique = timed(lambda: np.unique(array))
+    _, raw_unique = timed(lambda: np.unique(packed.view('S12')))
+    print("unique: S17 %.2fs, packed as S12 %.2fs" % (text_unique, raw_unique))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Measure decode_many and the command line decoder's throughput with 1, 2,
+4 and 8 worker processes.
+
+Usage: python benchmarks/bench_parallel.py [count]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.batch import decode_many
+from libvin.cli import decode_stream
+from tests import TEST_DATA
+
+
+class NullFile(object):
+    def write(self, text):
+        pass
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    base = [test['VIN'] for test in TEST_DATA]
+    vins = (base * (count // len(base) + 1))[:count]
+    fields = ('vin', 'region', 'country', 'manufacturer', 'make', 'year')
+
+    print("workers  decode_many VINs/sec  decode_stream VINs/sec")
+    for workers in (1, 2, 4, 8):
+        start = time.time()
+        decode_many(vins, workers=workers)
+        many = count / (time.time() - start)
+
+        start = time.time()
+        decode_stream(iter(vins), NullFile(), fields, workers=workers)
+        stream = count / (time.time() - start)
+        print("%7d  %20.0f  %22.0f" % (workers, many, stream))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Match VIN masks with regular expressions, compiled VinPatterns,
+match_many() over packed VINs, and PatternSet against thousands of
+patterns.
+
+Usage: python benchmarks/bench_patterns.py [count] [patterns]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.batch import match_many, pack_many
+from libvin.packing import ALPHABET
+from libvin.patterns import PatternSet, compile_mask
+from libvin.synth import generate
+
+
+def to_regex(mask):
+    return re.compile(mask.replace('*', '.').replace('?', '.'))
+
+
+def random_masks(vins, count, seed=1):
+    """
+    Returns count masks over the first 11 characters, each made from a
+    VIN with some positions opened or turned into a character class.
+    """
+    rng = random.Random(seed)
+    masks = []
+    for _ in range(count):
+        vin = rng.choice(vins)
+        mask = vin[:3]
+        for char in vin[3:11]:
+            roll = rng.random()
+            if roll < 0.4:
+                mask += '*'
+            elif roll < 0.5:
+                mask += '[%s%s]' % (char, rng.choice(ALPHABET))
+            else:
+                mask += char
+        masks.append(mask)
+    return masks
+
+
+def timed(func):
+    start = time.time()
+    result = func()
+    return result, time.time() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    npatterns = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    array, _ = generate(count, seed=1)
+    vins = [vin.decode('ascii') for vin in array.tolist()]
+    packed = pack_many(array)
+
+    mask = vins[0][:6] + '*' + vins[0][7] + '**'
+    regex, pattern = to_regex(mask), compile_mask(mask)
+    expected, regex_time = timed(lambda: sum(1 for vin in vins if regex.match(vin)))
+    found, pattern_time = timed(lambda: sum(1 for vin in vins if pattern.match(vin)))
+    assert found == expected
+    found, packed_time = timed(lambda: int(match_many(pattern, packed).sum()))
+    assert found == expected
+    print("one mask, %d VINs, %d matches:" % (count, found))
+    print("  regex %.2fs, VinPattern.match %.2fs, match_many on packed %.3fs" % (
+        regex_time, pattern_time, packed_time))
+
+    masks = random_masks(vins, npatterns)
+    patterns, build_time = timed(lambda: PatternSet(masks))
+    regexes = [to_regex(m) for m in masks]
+    sample = vins[:2000]
+    linear, linear_time = timed(lambda: [[i for i, r in enumerate(regexes) if r.match(vin)]
+                                         for vin in sample])
+    indexed, indexed_time = timed(lambda: [patterns.match(vin) for vin in sample])
+    assert indexed == linear
+    print("%d masks, built in %.2fs; per VIN: regex each %.0f us, PatternSet %.1f us" % (
+        npatterns, build_time, linear_time / len(sample) * 1e6,
+        indexed_time / len(sample) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
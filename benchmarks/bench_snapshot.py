@@ -0,0 +1,73 @@
+"""
+Time VpicSnapshot lookups in a snapshot of synthetic vPIC results, each
+with 140 fields of which 20 are set, as in real vPIC results.
+
+Usage: python benchmarks/bench_snapshot.py [patterns]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.snapshot import VpicSnapshot, build_snapshot
+from libvin.static import VIN_TRANSLATION, VIN_WEIGHT
+from tests import TEST_DATA
+
+FIELDS = ['Field%d' % i for i in range(139)]
+
+
+def with_check_digit(vin):
+    check = sum(VIN_WEIGHT[i] * VIN_TRANSLATION[c] for i, c in enumerate(vin)) % 11
+    return vin[:8] + ('X' if check == 10 else str(check)) + vin[9:]
+
+
+def synthetic_vins(count, rng):
+    chars = '0123456789ABCDEFGHJKLMNPRSTUVWXYZ'
+    base = [test['VIN'] for test in TEST_DATA]
+    vins = []
+    for _ in range(count):
+        vin = rng.choice(base)
+        vin = (vin[:3] + ''.join(rng.choice(chars) for _ in range(5)) + vin[8:11]
+               + '%06d' % rng.randrange(1000000))
+        vins.append(with_check_digit(vin))
+    return vins
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(1)
+    vins = synthetic_vins(count, rng)
+    results = []
+    for vin in vins:
+        result = dict((name, '') for name in FIELDS)
+        for name in rng.sample(FIELDS, 20):
+            result[name] = 'value %d' % rng.randrange(1000)
+        result['VIN'] = vin
+        results.append(result)
+
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'vpic.sqlite')
+        start = time.time()
+        stored = build_snapshot(results, path)
+        print("built %d patterns in %.1fs, %.0f bytes per pattern"
+              % (stored, time.time() - start, os.path.getsize(path) / float(stored)))
+
+        lookups = [rng.choice(vins) for _ in range(20000)]
+        with VpicSnapshot(path) as snapshot:
+            start = time.time()
+            for vin in lookups:
+                snapshot.decode(vin)
+            elapsed = time.time() - start
+        print("decode: %.1f us per VIN" % (1e6 * elapsed / len(lookups)))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Measure how fast libvin.synth generates VINs, in memory and streamed to
+a file, with five percent of them invalid.
+
+Usage: python benchmarks/bench_synth.py [count]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.synth import generate, write_vins
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+
+    start = time.time()
+    generate(1000000, seed=1, invalid=0.05)
+    print("generate:   %.2fM VINs/sec" % (1 / (time.time() - start)))
+
+    with tempfile.TemporaryFile() as f:
+        start = time.time()
+        write_vins(f, count, labels=True, seed=1, invalid=0.05)
+        elapsed = time.time() - start
+        size = f.tell()
+    print("write_vins: %.2fM VINs/sec (%d VINs, %.0f MB)"
+          % (count / elapsed / 1e6, count, size / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Compare libvin.batch.validate_many against a loop over Vin.is_valid.
+
+Usage: python benchmarks/bench_validate_many.py [count]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.batch import validate_many
+from libvin.decoding import Vin
+from tests import TEST_DATA
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    base = [test['VIN'] for test in TEST_DATA]
+    vins = (base * (count // len(base) + 1))[:count]
+
+    start = time.time()
+    expected = [Vin(vin).is_valid for vin in vins]
+    loop = time.time() - start
+
+    start = time.time()
+    valid, reasons = validate_many(vins)
+    batch = time.time() - start
+
+    assert list(valid) == expected
+    print("%d VINs: Vin.is_valid loop %.3fs, validate_many %.3fs, speedup %.1fx"
+          % (count, loop, batch, loop / batch))
+
+
+if __name__ == '__main__':
+    main()
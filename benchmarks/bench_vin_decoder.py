@@ -0,0 +1,58 @@
+"""
+Throughput of one VinDecoder shared by 1 to 32 threads, each decoding
+its share of a stream of repeated VINs, against the same threads each
+making a new Vin per VIN.
+
+Usage: python benchmarks/bench_vin_decoder.py [messages] [vehicles]
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_decode_cached import FIELDS, stream
+from libvin.decoding import Vin, VinDecoder
+
+THREADS = (1, 2, 4, 8, 16, 32)
+
+
+def run(threads, vins, decode):
+    """
+    Returns the seconds taken for threads threads to decode vins between
+    them, reading FIELDS from each result.
+    """
+    def work(chunk):
+        for vin in chunk:
+            result = decode(vin)
+            for field in FIELDS:
+                getattr(result, field)
+    workers = [threading.Thread(target=work, args=(vins[i::threads],))
+               for i in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.time() - start
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    vehicles = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    vins = stream(messages, vehicles)
+
+    print("%d messages from %d vehicles, VINs per second" % (len(vins), vehicles))
+    print("%8s %12s %12s %10s" % ('threads', 'Vin', 'VinDecoder', 'hit ratio'))
+    for threads in THREADS:
+        plain = run(threads, vins, Vin)
+        decoder = VinDecoder()
+        shared = run(threads, vins, decoder.decode)
+        print("%8d %12.0f %12.0f %10.3f" % (threads, len(vins) / plain, len(vins) / shared,
+                                            decoder.stats().hit_ratio))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Measure the memory held by decoded Vin objects and the cost of reading
+their properties repeatedly.
+
+Usage: python benchmarks/bench_vin_object.py [count]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libvin.decoding import Vin
+from tests import TEST_DATA
+
+FIELDS = ('country', 'region', 'manufacturer', 'make', 'year')
+
+
+def instance_size(v):
+    """
+    Returns the bytes held by v itself (not counting the shared strings
+    its fields point to, or the VIN string).
+    """
+    size = sys.getsizeof(v)
+    if hasattr(v, '__dict__'):
+        size += sys.getsizeof(v.__dict__)
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    base = [test['VIN'] for test in TEST_DATA]
+    vins = [Vin(vin) for vin in (base * (count // len(base) + 1))[:count]]
+
+    start = time.time()
+    for v in vins:
+        for field in FIELDS:
+            getattr(v, field)
+    first = time.time() - start
+
+    start = time.time()
+    for i in range(10):
+        for v in vins:
+            for field in FIELDS:
+                getattr(v, field)
+    repeat = (time.time() - start) / 10
+
+    print("bytes per decoded Vin: %d" % instance_size(vins[0]))
+    print("first read of %d fields: %.0f ns/Vin" % (len(FIELDS), first / count * 1e9))
+    print("repeated reads:         %.0f ns/Vin" % (repeat / count * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Decoding benchmark suite
+
+Measures the latency of each Vin property, and end-to-end decoding
+throughput over a synthetic corpus, and saves the results as JSON so
+runs on different commits can be compared:
+
+    python benchmarks/suite.py -o before.json
+    (change something)
+    python benchmarks/suite.py -o after.json --compare before.json
+
+The corpus is seeded, so every run decodes the same VINs.  Its
+manufacturers follow a Zipf distribution over the WMIs in WMI_MAP, as a
+few manufacturers build most vehicles; each has a handful of models,
+plants and years, and serial numbers are random.  One VIN in fifty has
+a wrong check digit.
+"""
+
+import argparse
+import bisect
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from libvin.decoding import Vin
+from libvin.static import VIN_TRANSLATION, VIN_WEIGHT, WMI_MAP, YEARS_CODES_PRE_2040
+
+PROPERTIES = ('wmi', 'vds', 'vis', 'vsn', 'squish', 'region', 'country',
+              'manufacturer', 'make', 'year', 'is_pre_2010',
+              'less_than_500_built_per_year', 'is_valid')
+
+# Characters allowed in a VIN
+CHARS = '0123456789ABCDEFGHJKLMNPRSTUVWXYZ'
+
+
+def _check_digit(total):
+    check = total % 11
+    return 'X' if check == 10 else str(check)
+
+
+def make_corpus(count, seed=1, patterns=5000):
+    """
+    Returns count synthetic VINs, the same for the same seed.
+    """
+    rng = random.Random(seed)
+    wmis = sorted(wmi for wmi in WMI_MAP
+                  if len(wmi) == 3 and all(c in CHARS for c in wmi))
+    rng.shuffle(wmis)
+    # Cumulative Zipf weights
+    cumulative = []
+    total = 0.0
+    for rank in range(len(wmis)):
+        total += 1.0 / (rank + 1)
+        cumulative.append(total)
+    years = [code for code in YEARS_CODES_PRE_2040 if code.isalpha()]
+
+    # Everything but the check digit and serial number, with the weighted
+    # sum of its characters
+    prefixes = []
+    for _ in range(patterns):
+        wmi = wmis[bisect.bisect(cumulative, rng.random() * total)]
+        vds = ''.join(rng.choice(CHARS) for _ in range(4)) + rng.choice(CHARS[10:])
+        prefix = wmi + vds + '?' + rng.choice(years) + rng.choice(CHARS)
+        weighted = sum(VIN_WEIGHT[i] * VIN_TRANSLATION[c]
+                       for i, c in enumerate(prefix) if c != '?')
+        prefixes.append((prefix, weighted))
+
+    vins = []
+    serial_weights = VIN_WEIGHT[11:]
+    for _ in range(count):
+        prefix, weighted = prefixes[rng.randrange(patterns)]
+        serial = '%06d' % rng.randrange(1000000)
+        weighted += sum(w * int(c) for w, c in zip(serial_weights, serial))
+        check = _check_digit(weighted)
+        if rng.random() < 0.02:
+            check = _check_digit(weighted + 1)
+        vins.append(prefix[:8] + check + prefix[9:] + serial)
+    return vins
+
+
+def _best(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def property_latency(vins):
+    """
+    Returns {metric: nanoseconds} for the first read of each property
+    on a new Vin, with Vin construction subtracted, and for reading it
+    again.
+    """
+    results = {}
+    construct = _best(lambda: [Vin(vin) for vin in vins])
+    results['construct_ns'] = construct / len(vins) * 1e9
+    decoded = [Vin(vin) for vin in vins]
+    for name in PROPERTIES:
+        first = _best(lambda: [getattr(Vin(vin), name) for vin in vins])
+        for v in decoded:
+            getattr(v, name)
+        again = _best(lambda: [getattr(v, name) for v in decoded])
+        results['%s.first_ns' % name] = max(first - construct, 0) / len(vins) * 1e9
+        results['%s.again_ns' % name] = again / len(vins) * 1e9
+    return results
+
+
+def throughput(vins):
+    """
+    Returns {metric: VINs per second} for decoding every property of
+    each VIN, and for the batch API if numpy is installed.
+    """
+    results = {}
+
+    def decode_all():
+        for vin in vins:
+            v = Vin(vin)
+            for name in PROPERTIES:
+                getattr(v, name)
+    results['vin_all_properties.per_sec'] = len(vins) / _best(decode_all, 1)
+
+    try:
+        from libvin.batch import decode_many, validate_many
+    except ImportError:
+        return results
+    results['validate_many.per_sec'] = len(vins) / _best(lambda: validate_many(vins), 1)
+    results['decode_many.per_sec'] = len(vins) / _best(lambda: decode_many(vins), 1)
+    return results
+
+
+def git_commit():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            output = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                             cwd=ROOT, stderr=devnull)
+        return output.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new):
+    """
+    Prints each metric in both runs with the ratio of new to old.
+    Metrics ending in _ns are better lower; per_sec, higher.
+    """
+    print("%-40s %12s %12s %8s" % ('metric', 'old', 'new', 'new/old'))
+    for name in sorted(set(old['results']) & set(new['results'])):
+        a, b = old['results'][name], new['results'][name]
+        ratio = b / a if a else float('inf')
+        print("%-40s %12.1f %12.1f %8.2f" % (name, a, b, ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the libvin decoding benchmarks.")
+    parser.add_argument('-n', '--count', type=int, default=1000000,
+                        help="VINs in the throughput corpus (default %(default)s)")
+    parser.add_argument('--sample', type=int, default=20000,
+                        help="VINs to time each property on (default %(default)s)")
+    parser.add_argument('-o', '--output', help="file to save the results to as JSON")
+    parser.add_argument('--compare', help="results file from an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    vins = make_corpus(args.count)
+    sys.stderr.write("made %d VINs in %.1fs\n" % (len(vins), time.time() - start))
+
+    results = {}
+    results.update(property_latency(vins[:args.sample]))
+    results.update(throughput(vins))
+    run = {
+        'commit': git_commit(),
+        'date': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'count': args.count,
+        'sample': args.sample,
+        'results': results,
+    }
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), run)
+    else:
+        for name in sorted(results):
+            print("%-40s %12.1f" % (name, results[name]))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,8 @@
-from nhtsa import nhtsa_decode
+def nhtsa_decode(vin):
+    '''
+    Return vpic.nhtsa.dot.gov's interpretation of the VIN in a dictionary, or None on error.
+    See libvin.nhtsa.nhtsa_decode(); libvin.nhtsa, and the requests
+    library it needs, are only imported on first use.
+    '''
+    from libvin.nhtsa import nhtsa_decode
+    return nhtsa_decode(vin)
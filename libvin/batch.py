@@ -0,0 +1,399 @@
+"""
+Whole-array VIN checks and decoding over NumPy arrays
+
+Validating or decoding VINs one Vin object at a time costs a dozen dict
+lookups per character.  The functions here pack a sequence of VINs into a
+fixed-width uint8 array once, then run every test from Vin.is_valid as a
+handful of array operations, and resolve each distinct WMI only once.
+"""
+
+import numpy as np
+
+from libvin.codes import (VIN_TRANSLATION, VIN_WEIGHT, YEARS_CODES_PRE_2010,
+    YEARS_CODES_PRE_2040)
+from libvin.decoding import Vin
+from libvin.packing import ALPHABET
+from libvin.patterns import VinPattern
+from libvin.parallel import pool_size, worker_pool
+from libvin.tables import COUNTRIES, REGIONS, lookup_wmi
+
+# Reason codes returned by validate_many(), in the order Vin.is_valid
+# applies the corresponding tests.  Only the first failing test is reported.
+REASON_OK = 0
+REASON_LENGTH = 1
+REASON_ILLEGAL_CHAR = 2
+REASON_YEAR_CODE = 3
+REASON_CHECK_DIGIT = 4
+
+REASON_NAMES = {
+    REASON_OK: 'ok',
+    REASON_LENGTH: 'length',
+    REASON_ILLEGAL_CHAR: 'illegal_char',
+    REASON_YEAR_CODE: 'year_code',
+    REASON_CHECK_DIGIT: 'check_digit',
+}
+
+# Rows are processed in blocks small enough to stay in cache.
+_BLOCK_ROWS = 4096
+
+# Any character that may not appear in a VIN (I, O, Q and anything that
+# isn't alphanumeric) translates to this, so a single weighted sum both
+# computes the check digit and flags illegal characters.  Every weight
+# but the check digit's is at least 2, and the largest legal sum is 738.
+_ILLEGAL = 10000.0
+
+# Byte -> transliterated value; both cases are accepted, like Vin does.
+_TRANSLATION = np.full(256, _ILLEGAL, dtype=np.float32)
+for _char, _value in VIN_TRANSLATION.items():
+    _TRANSLATION[ord(_char)] = _value
+    _TRANSLATION[ord(_char.lower())] = _value
+
+# Byte -> True if it may not be used as the model year (position 10).
+_BAD_YEAR = np.zeros(256, dtype=bool)
+for _char in 'UZ0uz':
+    _BAD_YEAR[ord(_char)] = True
+
+# Byte -> value of the check digit (position 9), or -1.
+_CHECK_VALUE = np.full(256, -1, dtype=np.int32)
+for _value, _char in enumerate('0123456789X'):
+    _CHECK_VALUE[ord(_char)] = _value
+_CHECK_VALUE[ord('x')] = 10
+
+# The trailing zero weight covers the padding column used to spot
+# over-long VINs.
+_WEIGHTS = np.array(VIN_WEIGHT + [0], dtype=np.float32)
+
+
+def _raw_array(vins):
+    """
+    Returns vins as an N x 18 uint8 array, NUL-padded.
+
+    The spare column holds a non-NUL byte only for VINs that are too long.
+    """
+    return np.array(vins, dtype='S18').reshape(-1).view(np.uint8).reshape(-1, 18)
+
+
+def char_array(vins):
+    """
+    Packs a sequence of VIN strings into an upper-cased N x 17 uint8 array.
+
+    Returns (chars, length_ok), where length_ok is a boolean array that is
+    False for entries that were not exactly 17 characters long; their rows
+    in chars are truncated or NUL-padded.
+    """
+    raw = _raw_array(vins)
+    length_ok = (raw[:, 16] != 0) & (raw[:, 17] == 0)
+    chars = raw[:, :17].copy()
+    chars[(chars >= ord('a')) & (chars <= ord('z'))] -= 32
+    return chars, length_ok
+
+
+def _validate_block(block, reasons):
+    """
+    Fills reasons with the REASON_* code of each row of block, which is
+    a uint8 array of either 17 or 18 (NUL-padded) columns.
+    """
+    total = _TRANSLATION.take(block).dot(_WEIGHTS[:block.shape[1]])
+    check = _CHECK_VALUE.take(block[:, 8])
+    # The check digit has weight 0, so test it for illegal characters alone.
+    illegal = (total >= _ILLEGAL) | (_TRANSLATION.take(block[:, 8]) >= _ILLEGAL)
+
+    reasons.fill(REASON_CHECK_DIGIT)
+    reasons[total.astype(np.int32) % 11 == check] = REASON_OK
+    reasons[_BAD_YEAR.take(block[:, 9])] = REASON_YEAR_CODE
+    reasons[illegal] = REASON_ILLEGAL_CHAR
+    if block.shape[1] > 17:
+        reasons[(block[:, 16] == 0) | (block[:, 17] != 0)] = REASON_LENGTH
+
+
+def validate_many(vins):
+    """
+    Validates many VINs at once.
+
+    Accepts a sequence of VIN strings, or an N x 17 uint8 array as returned
+    by char_array() (all rows of which are taken to have the right length).
+
+    Returns (valid, reasons): a boolean array which is True where
+    Vin(vin).is_valid would be True, and a uint8 array holding the
+    REASON_* code of the first test each VIN failed.
+    """
+    if isinstance(vins, np.ndarray) and vins.dtype == np.uint8 and vins.ndim == 2:
+        chars = vins
+    else:
+        chars = _raw_array(vins)
+
+    reasons = np.empty(len(chars), dtype=np.uint8)
+    for start in range(0, len(chars), _BLOCK_ROWS):
+        stop = start + _BLOCK_ROWS
+        _validate_block(chars[start:stop], reasons[start:stop])
+    return reasons == REASON_OK, reasons
+
+
+# Columns returned by decode_many(), named after the Vin properties.
+DECODE_FIELDS = (
+    'vin', 'wmi', 'vds', 'vis', 'vsn', 'region', 'country', 'manufacturer',
+    'make', 'year', 'is_pre_2010', 'less_than_500_built_per_year', 'is_valid',
+)
+
+# (is_pre_2010, byte) -> model year, or 0 for codes that aren't years.
+_YEARS = np.zeros((2, 256), dtype=np.int16)
+for _char, _year in YEARS_CODES_PRE_2040.items():
+    _YEARS[0, ord(_char)] = _year
+for _char, _year in YEARS_CODES_PRE_2010.items():
+    _YEARS[1, ord(_char)] = _year
+
+
+def _text(chars):
+    """
+    Returns the rows of a uint8 array as an array of native strings.
+    """
+    chars = np.ascontiguousarray(chars)
+    return chars.view('S%d' % chars.shape[1]).reshape(-1).astype(str)
+
+
+def _lookup(keys, decode):
+    """
+    Calls decode() once per distinct row of keys, a uint8 array, and
+    returns an object array holding the result for every row.
+    """
+    keys = np.ascontiguousarray(keys)
+    distinct, inverse = np.unique(keys.view('S%d' % keys.shape[1]).reshape(-1),
+                                  return_inverse=True)
+    values = np.empty(len(distinct), dtype=object)
+    for i, key in enumerate(distinct.astype(str)):
+        values[i] = decode(key)
+    return values[inverse]
+
+
+def _region(key):
+    return REGIONS.get(key, 'Unknown')
+
+
+def _country(key):
+    return COUNTRIES.get(key, 'Unknown')
+
+
+def _manufacturer(key):
+    return lookup_wmi(key)[0]
+
+
+def _make(key):
+    # key is the first five characters plus '1' for model years after
+    # 2011, which is all Vin.make looks at; fill in the rest with a
+    # placeholder year code from the right era.
+    if key[5:] == '1':
+        vin = key[:5] + 'AAAAC' + 'A' * 7
+    else:
+        vin = key[:5] + 'A1AAA' + 'A' * 7
+    try:
+        return Vin(vin).make
+    except (KeyError, IndexError):
+        return 'Unknown'
+
+
+def _is_pre_2010(chars, length_ok):
+    return (chars[:, 6] >= ord('0')) & (chars[:, 6] <= ord('9'))
+
+
+def _year(chars, length_ok):
+    return _YEARS[_is_pre_2010(chars, length_ok).view(np.uint8), chars[:, 9]]
+
+
+def _fewer_than_500(chars, length_ok):
+    return chars[:, 2] == ord('9')
+
+
+def _vsn(chars, length_ok):
+    return np.where(_fewer_than_500(chars, length_ok),
+                    _text(chars[:, 14:]), _text(chars[:, 11:]))
+
+
+def _makes(chars, length_ok):
+    keys = np.empty((len(chars), 6), dtype=np.uint8)
+    keys[:, :5] = chars[:, :5]
+    keys[:, 5] = np.where(_year(chars, length_ok) > 2011, ord('1'), ord('0'))
+    return _lookup(keys, _make)
+
+
+def _is_valid(chars, length_ok):
+    return validate_many(chars)[0] & length_ok
+
+
+# Field name -> function(chars, length_ok) returning its column
+_COLUMNS = {
+    'vin': lambda chars, length_ok: _text(chars),
+    'wmi': lambda chars, length_ok: _text(chars[:, :3]),
+    'vds': lambda chars, length_ok: _text(chars[:, 3:9]),
+    'vis': lambda chars, length_ok: _text(chars[:, 9:]),
+    'vsn': _vsn,
+    'region': lambda chars, length_ok: _lookup(chars[:, :1], _region),
+    'country': lambda chars, length_ok: _lookup(chars[:, :2], _country),
+    'manufacturer': lambda chars, length_ok: _lookup(chars[:, :3], _manufacturer),
+    'make': _makes,
+    'year': _year,
+    'is_pre_2010': _is_pre_2010,
+    'less_than_500_built_per_year': _fewer_than_500,
+    'is_valid': _is_valid,
+}
+
+
+# Fields worked out from the VIN rather than copied out of it, which are
+# set to 'Unknown', 0 or False for VINs whose positions can't be read:
+# those of the wrong length or with illegal characters
+_DECODED = ('region', 'country', 'manufacturer', 'make', 'year', 'is_pre_2010',
+            'less_than_500_built_per_year')
+
+
+def _decode_chars(args):
+    chars, length_ok, fields = args
+    columns = dict((field, _COLUMNS[field](chars, length_ok)) for field in fields)
+    blank = [field for field in fields if field in _DECODED]
+    if blank:
+        unreadable = (validate_many(chars)[1] == REASON_ILLEGAL_CHAR) | ~length_ok
+        for field in blank:
+            columns[field][unreadable] = 'Unknown' if columns[field].dtype == object else 0
+    return columns
+
+
+def decode_many(vins, fields=DECODE_FIELDS, workers=1, processes=None):
+    """
+    Decodes many VINs at once.
+
+    Returns a dict mapping each name in fields (by default, all of
+    DECODE_FIELDS) to an array holding that Vin property for every VIN,
+    in input order; pandas.DataFrame() accepts it as is.  Only the
+    requested fields are computed.  Manufacturer-level fields are looked
+    up once per distinct WMI rather than once per VIN.  VINs that are
+    only invalid because of their check digit or year code decode as
+    Vin decodes them, with 0 for a year code that isn't one.  For VINs
+    of the wrong length or with illegal characters, the fields worked
+    out from the VIN (region, country, manufacturer, make, year,
+    is_pre_2010 and less_than_500_built_per_year) hold 'Unknown', 0 or
+    False; vin holds the whole VIN, and the other parts are cut from it
+    as if truncated or padded to 17 characters.
+
+    workers is the number of processes to split the work between, or a
+    multiprocessing.Pool to use.  Each process gets one contiguous shard
+    of the input, packed as 17 bytes per VIN.  With a Pool, processes is
+    the number it was made with; by default it is taken to have one per
+    CPU, as Pool() does.
+    """
+    unknown = [field for field in fields if field not in _COLUMNS]
+    if unknown:
+        raise ValueError("unknown fields: %s" % ', '.join(unknown))
+    if not isinstance(vins, (list, tuple, np.ndarray)):
+        vins = list(vins)
+    chars, length_ok = char_array(vins)
+    if workers == 1:
+        columns = _decode_chars((chars, length_ok, fields))
+    else:
+        with worker_pool(workers) as pool:
+            bounds = np.linspace(0, len(chars), pool_size(workers, processes) + 1).astype(int)
+            shards = [(chars[start:stop], length_ok[start:stop], fields)
+                      for start, stop in zip(bounds[:-1], bounds[1:])]
+            parts = pool.map(_decode_chars, shards)
+        columns = dict((field, np.concatenate([part[field] for part in parts]))
+                       for field in fields)
+    if 'vin' in columns and not length_ok.all():
+        # chars cut over-long VINs short; vin holds them whole, as Vin does
+        columns['vin'] = np.array([vin.upper() for vin in vins]).astype(str)
+    return columns
+
+
+# Packed VINs as returned by pack_many(): the first 12 characters and the
+# last 5, each as a base-33 number as in libvin.packing.  Sorting an array
+# of them sorts by high, then low, which is the order of the VINs.  Both
+# are big-endian, so the raw bytes sort the same way too: sorting or
+# deduplicating packed.view('S12') is several times faster.
+PACKED_DTYPE = np.dtype([('high', '>u8'), ('low', '>u4')])
+
+# Byte -> digit value as in libvin.packing, or 255 for non-VIN characters
+_PACK_DIGITS = np.full(256, 255, dtype=np.uint8)
+for _digit, _char in enumerate(ALPHABET):
+    _PACK_DIGITS[ord(_char)] = _PACK_DIGITS[ord(_char.lower())] = _digit
+_PACK_CHARS = np.frombuffer(ALPHABET.encode('ascii'), dtype=np.uint8)
+
+# Place values of the characters in each half
+_HIGH_POWERS = np.array([33 ** i for i in range(11, -1, -1)], dtype=np.uint64)
+_LOW_POWERS = np.array([33 ** i for i in range(4, -1, -1)], dtype=np.uint64)
+
+
+def pack_many(vins):
+    """
+    Packs a sequence of VIN strings, or an N x 17 uint8 array as returned
+    by char_array(), into an array of PACKED_DTYPE, 12 bytes per VIN.
+    high * 33 ** 5 + low is what libvin.packing.pack_vin() returns.
+    Raises ValueError if any VIN has the wrong length or a character
+    that can't appear in a VIN.
+    """
+    if isinstance(vins, np.ndarray) and vins.dtype == np.uint8 and vins.ndim == 2:
+        chars, length_ok = vins, np.ones(len(vins), dtype=bool)
+    else:
+        chars, length_ok = char_array(vins)
+    digits = _PACK_DIGITS.take(chars)
+    bad = np.flatnonzero(~length_ok | (digits == 255).any(axis=1))
+    if len(bad):
+        raise ValueError("%d values can't be packed, the first at index %d"
+                         % (len(bad), bad[0]))
+    digits = digits.astype(np.uint64)
+    packed = np.empty(len(chars), dtype=PACKED_DTYPE)
+    packed['high'] = digits[:, :12].dot(_HIGH_POWERS)
+    packed['low'] = digits[:, 12:].dot(_LOW_POWERS)
+    return packed
+
+
+def unpack_many(packed):
+    """
+    Returns the VINs in an array of PACKED_DTYPE as an array of 17 byte
+    strings.
+    """
+    digits = np.empty((len(packed), 17), dtype=np.uint8)
+    base = np.uint64(33)
+    for field, columns in (('high', range(11, -1, -1)), ('low', range(16, 11, -1))):
+        values = packed[field].astype(np.uint64)
+        for column in columns:
+            digits[:, column] = values % base
+            values //= base
+    return _PACK_CHARS.take(digits).view('S17').reshape(-1)
+
+
+def packed_digits(packed, position):
+    """
+    Returns the digit values, as in libvin.packing, of the characters at
+    position, from 0, of an array of PACKED_DTYPE.
+    """
+    if position < 12:
+        values, place = packed['high'], 33 ** (11 - position)
+    else:
+        values, place = packed['low'], 33 ** (16 - position)
+    return (values // np.uint64(place) % np.uint64(33)).astype(np.uint8)
+
+
+def match_many(pattern, vins, start=0):
+    """
+    Returns a boolean array which is True for each VIN matching pattern,
+    a libvin.patterns.VinPattern or a mask.  vins may be a sequence of
+    VIN strings, an N x 17 uint8 array as returned by char_array(), or
+    an array of PACKED_DTYPE; packed VINs are matched without unpacking.
+    VINs of the wrong length never match.  Positions before start aren't
+    checked, for VINs already known to match there.
+    """
+    if not isinstance(pattern, VinPattern):
+        pattern = VinPattern(pattern)
+    if isinstance(vins, np.ndarray) and vins.dtype == PACKED_DTYPE:
+        digits = lambda position: packed_digits(vins, position)
+        match = np.ones(len(vins), dtype=bool)
+    else:
+        if isinstance(vins, np.ndarray) and vins.dtype == np.uint8 and vins.ndim == 2:
+            chars, match = vins, np.ones(len(vins), dtype=bool)
+        else:
+            chars, match = char_array(vins)
+        digits = lambda position: _PACK_DIGITS.take(chars[:, position])
+    for position, bits in pattern.checks:
+        if position < start:
+            continue
+        # Digit -> allowed; 255, for characters that aren't, is never
+        allowed = np.zeros(256, dtype=bool)
+        allowed[[digit for digit in range(len(ALPHABET)) if bits >> digit & 1]] = True
+        match &= allowed.take(digits(position))
+    return match
@@ -0,0 +1,205 @@
+"""
+Command line VIN decoder
+
+Streams VINs from a newline-delimited or CSV file (or stdin) through
+libvin.batch.decode_many a chunk at a time, so memory use doesn't grow
+with the size of the input, and writes the decoded fields as CSV or
+JSON lines.  Chunks can be decoded and formatted by several worker
+processes; output stays in input order.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from libvin.batch import DECODE_FIELDS, decode_many
+from libvin.parallel import imap_ordered, worker_pool
+
+
+def read_lines(infile):
+    """
+    Yields the VINs in a file with one VIN per line, skipping blank lines.
+    """
+    for line in infile:
+        vin = line.strip()
+        if vin:
+            yield vin
+
+
+def read_csv(infile, column=None):
+    """
+    Returns an iterator over the VINs in a CSV file with a header row.
+    column names the column holding the VINs; by default it is the one
+    named 'vin' in any case, or else the first one.  The header is read
+    straight away, so a missing column raises ValueError here.
+    """
+    reader = csv.reader(infile)
+    header = next(reader, None)
+    if header is None:
+        return iter([])
+    names = [name.strip().lower() for name in header]
+    if column is None:
+        index = names.index('vin') if 'vin' in names else 0
+    elif column.lower() in names:
+        index = names.index(column.lower())
+    else:
+        raise ValueError("no column named %r in %s" % (column, infile.name))
+    return _csv_column(reader, index)
+
+
+def _csv_column(reader, index):
+    for row in reader:
+        if len(row) > index and row[index].strip():
+            yield row[index].strip()
+
+
+def chunks(iterable, size):
+    """
+    Yields successive lists of up to size items from iterable.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def format_csv(fields, rows):
+    out = StringIO()
+    csv.writer(out).writerows(rows)
+    return out.getvalue()
+
+
+def format_jsonl(fields, rows):
+    return ''.join(json.dumps(dict(zip(fields, row))) + '\n' for row in rows)
+
+
+FORMATS = {
+    'csv': format_csv,
+    'jsonl': format_jsonl,
+}
+
+
+def decode_chunk(args):
+    """
+    Decodes a list of VINs and returns (count, the formatted output).
+    """
+    vins, fields, output_format = args
+    decoded = decode_many(vins, fields)
+    rows = zip(*[decoded[field].tolist() for field in fields])
+    return len(vins), FORMATS[output_format](fields, rows)
+
+
+def _decode_chunks(tasks, workers):
+    if workers == 1:
+        for task in tasks:
+            yield decode_chunk(task)
+    else:
+        with worker_pool(workers) as pool:
+            for result in imap_ordered(pool, decode_chunk, tasks, 2 * workers):
+                yield result
+
+
+def decode_stream(vins, outfile, fields, output_format='csv', chunk_size=10000,
+                  workers=1):
+    """
+    Decodes an iterable of VINs chunk_size at a time, writing the given
+    fields of each to outfile.  With more than one worker, at most two
+    chunks per worker are read ahead of what has been written.
+    Returns the number of VINs.
+    """
+    if output_format == 'csv':
+        outfile.write(format_csv(fields, [fields]))
+    tasks = ((chunk, fields, output_format) for chunk in chunks(vins, chunk_size))
+
+    count = 0
+    for decoded, text in _decode_chunks(tasks, workers):
+        outfile.write(text)
+        count += decoded
+    return count
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='libvin', description="Decode a file of Vehicle Identification Numbers.")
+    parser.add_argument('input', nargs='?', default='-',
+                        help="file to read VINs from; default is stdin")
+    parser.add_argument('-o', '--output', default='-',
+                        help="file to write decoded VINs to; default is stdout")
+    parser.add_argument('--input-format', choices=['lines', 'csv'],
+                        help="'lines' for one VIN per line, or 'csv' for a CSV "
+                             "file with a header row; default depends on the "
+                             "input file's extension")
+    parser.add_argument('--column',
+                        help="name of the CSV column holding the VINs; default "
+                             "is 'vin', or else the first column")
+    parser.add_argument('--output-format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('-f', '--fields', default=','.join(DECODE_FIELDS),
+                        help="comma separated fields to write; default is all "
+                             "of: %(default)s")
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help="VINs to decode at a time (default %(default)s)")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="number of processes to decode with (default %(default)s)")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="don't report throughput on stderr")
+    args = parser.parse_args(argv)
+
+    args.fields = [field.strip() for field in args.fields.split(',') if field.strip()]
+    unknown = [field for field in args.fields if field not in DECODE_FIELDS]
+    if unknown or not args.fields:
+        parser.error("unknown fields: %s" % ', '.join(unknown) if unknown else
+                     "no fields given")
+    if args.chunk_size < 1:
+        parser.error("chunk size must be at least 1")
+    if args.workers < 1:
+        parser.error("workers must be at least 1")
+    if args.input_format is None:
+        args.input_format = 'csv' if args.input.lower().endswith('.csv') else 'lines'
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    infile = outfile = None
+    try:
+        infile = sys.stdin if args.input == '-' else open(args.input, 'r')
+        outfile = sys.stdout if args.output == '-' else open(args.output, 'w')
+        if args.input_format == 'csv':
+            try:
+                vins = read_csv(infile, args.column)
+            except ValueError as e:
+                sys.stderr.write("libvin: %s\n" % e)
+                return 1
+        else:
+            vins = read_lines(infile)
+        start = time.time()
+        count = decode_stream(vins, outfile, args.fields, args.output_format,
+                              args.chunk_size, args.workers)
+        elapsed = time.time() - start
+    except EnvironmentError as e:
+        sys.stderr.write("libvin: %s\n" % e)
+        return 1
+    finally:
+        if infile not in (None, sys.stdin):
+            infile.close()
+        if outfile not in (None, sys.stdout):
+            outfile.close()
+
+    if not args.quiet:
+        sys.stderr.write("libvin: decoded %d VINs in %.2fs (%.0f VINs/sec)\n"
+                         % (count, elapsed, count / elapsed if elapsed else 0))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Suggest valid VINs close to an invalid one
+
+A VIN that was mistyped or misread usually differs from the real one in
+a single character.  suggest_corrections() lists the valid VINs within a
+few substituted characters, most likely first, without trying every
+character in every position: changing the character at position p
+changes the check digit sum by its weight times the change in value, so
+the values that can fix the sum at p follow from one modular inverse.
+"""
+
+from libvin.codes import VIN_TRANSLATION, VIN_WEIGHT
+from libvin.parallel import worker_pool
+from libvin.tables import UNKNOWN_WMI, lookup_wmi
+
+_ALPHABET = '0123456789ABCDEFGHJKLMNPRSTUVWXYZ'
+_CHECK_CHARS = '0123456789X'
+_CHECK_POSITION = 8
+_YEAR_POSITION = 9
+
+# Characters that may appear at each position
+_ALLOWED = [_ALPHABET] * 17
+_ALLOWED[_CHECK_POSITION] = _CHECK_CHARS
+_ALLOWED[_YEAR_POSITION] = ''.join(c for c in _ALPHABET if c not in 'UZ0')
+
+# Position -> {value mod 11: characters allowed there with that value}
+_BY_VALUE = [dict((r, [c for c in allowed if VIN_TRANSLATION[c] % 11 == r])
+                  for r in range(11)) for allowed in _ALLOWED]
+
+# Weight -> its inverse modulo 11 (11 is prime, so x ** 9 * x == 1)
+_INVERSE = dict((w, pow(w, 9, 11)) for w in VIN_WEIGHT if w)
+
+# Pairs of characters often mistaken for each other when VINs are read
+# by eye or by OCR.  I, O and Q never appear in VINs, so reading one is
+# always a mistake.
+OCR_CONFUSIONS = [
+    ('0', 'O'), ('0', 'Q'), ('0', 'D'), ('1', 'I'), ('1', 'L'), ('2', 'Z'),
+    ('5', 'S'), ('6', 'G'), ('8', 'B'), ('U', 'V'),
+]
+_CONFUSED = set(OCR_CONFUSIONS) | set((b, a) for a, b in OCR_CONFUSIONS)
+
+
+def _solutions(chars, total, position):
+    """
+    Returns the characters that, put at position, would make the check
+    digit right, given the weighted sum of every other position.
+    """
+    if position == _CHECK_POSITION:
+        return [_CHECK_CHARS[total % 11]]
+    check = _CHECK_CHARS.find(chars[_CHECK_POSITION])
+    if check < 0:
+        return []
+    weight = VIN_WEIGHT[position]
+    current = VIN_TRANSLATION.get(chars[position], 0)
+    needed = (current + (check - total) * _INVERSE[weight]) % 11
+    return _BY_VALUE[position][needed]
+
+
+def _search(chars, total, edits, start, bad):
+    """
+    Yields (VIN, positions changed) for each valid VIN made by changing
+    exactly edits characters of chars at positions from start on,
+    including every position in bad.  total is the weighted sum of chars
+    without the check digit.
+    """
+    if len(bad) > edits:
+        return
+    if edits == 1:
+        positions = bad if bad else range(start, 17)
+        for position in positions:
+            if position < start:
+                continue
+            for c in _solutions(chars, total, position):
+                if c != chars[position]:
+                    yield chars[:position] + [c] + chars[position + 1:], (position,)
+        return
+    for position in range(start, 17):
+        if bad and position > bad[0]:
+            # Every position before the first bad one has been passed over
+            break
+        weight = VIN_WEIGHT[position]
+        current = VIN_TRANSLATION.get(chars[position], 0)
+        rest = [p for p in bad if p != position]
+        for c in _ALLOWED[position]:
+            if c == chars[position]:
+                continue
+            changed = chars[:position] + [c] + chars[position + 1:]
+            changed_total = total + weight * (VIN_TRANSLATION[c] - current)
+            for vin, positions in _search(changed, changed_total, edits - 1,
+                                          position + 1, rest):
+                yield vin, (position,) + positions
+
+
+def suggest_corrections(vin, max_edits=1, known_wmi=True):
+    """
+    Returns the valid VINs that differ from vin in at most max_edits
+    characters, or [vin] if it is valid already.  Fewer changes come
+    first, then those made up of more OCR_CONFUSIONS.  With known_wmi,
+    only VINs whose WMI is in libvin.tables.WMIS are returned.  Doesn't
+    try to fix VINs of the wrong length.
+    """
+    chars = list(vin.strip().upper())
+    if len(chars) != 17:
+        return []
+    bad = [p for p, c in enumerate(chars) if c not in _ALLOWED[p]]
+    total = sum(VIN_WEIGHT[p] * VIN_TRANSLATION.get(c, 0) for p, c in enumerate(chars))
+    if not bad and total % 11 == _CHECK_CHARS.find(chars[_CHECK_POSITION]):
+        return [''.join(chars)]
+
+    found = []
+    seen = set()
+    # WMI -> whether it is known; most candidates keep the original WMI
+    known = {}
+    for edits in range(1, max_edits + 1):
+        ranked = []
+        for candidate, positions in _search(chars, total, edits, 0, bad):
+            candidate = ''.join(candidate)
+            if candidate in seen:
+                continue
+            seen.add(candidate)
+            if known_wmi:
+                wmi = candidate[:3]
+                if wmi not in known:
+                    known[wmi] = lookup_wmi(wmi) is not UNKNOWN_WMI
+                if not known[wmi]:
+                    continue
+            confusions = 0
+            for p in positions:
+                if (chars[p], candidate[p]) in _CONFUSED:
+                    confusions += 1
+            ranked.append((-confusions, positions, candidate))
+        found.extend(candidate for _, _, candidate in sorted(ranked))
+    return found
+
+
+def _suggest(args):
+    vin, max_edits, known_wmi = args
+    return suggest_corrections(vin, max_edits, known_wmi)
+
+
+def suggest_many(vins, max_edits=1, known_wmi=True, workers=1):
+    """
+    Returns [suggest_corrections(vin, max_edits, known_wmi) for vin in
+    vins], spread over workers processes (or a multiprocessing.Pool)
+    when workers isn't 1.
+    """
+    tasks = [(vin, max_edits, known_wmi) for vin in vins]
+    if workers == 1:
+        return [_suggest(task) for task in tasks]
+    with worker_pool(workers) as pool:
+        return pool.map(_suggest, tasks, chunksize=1000)
@@ -4,24 +4,126 @@ libvin - VIN Vehicle information number checker
 (c) Copyright 2016 Dan Kegel <dank@kegel.com>
 """
 
-from libvin.static import *
+import sys
+from collections import Counter, namedtuple
+
+from libvin.lru import CacheStats, LRUCache
+# Not libvin.static, whose tables libvin.tables only loads when it has to;
+# import WMI_MAP and the rest from there
+from libvin.codes import *
+from libvin.tables import COUNTRIES, REGIONS, lookup_wmi
+
+# What a Vin knows about its manufacturer; one instance is shared by all
+# Vins with the same WMI (and, where BRAND_CODES applies, the same brand).
+WmiInfo = namedtuple('WmiInfo', 'region country manufacturer make brand_codes')
+
+# WMI, or (WMI, brand code), -> WmiInfo.  Replace with a larger
+# LRUCache if wmi_cache.stats() shows many evictions.
+wmi_cache = LRUCache(4096)
+
+# Normalized VIN -> DecodedVin, for decode_cached().  Replace with an
+# LRUCache of another size, or anything else with the same get() and
+# put(), to change how many records are kept or which are evicted.
+decode_cache = LRUCache(65536)
+
+# Rules a VIN can fail, as bits of ValidationResult.failed
+RULE_LENGTH = 1
+RULE_ILLEGAL_CHAR = 2
+RULE_YEAR_CODE = 4
+RULE_CHECK_DIGIT = 8
+
+# Named as libvin.batch.REASON_NAMES names them
+RULE_NAMES = {
+    RULE_LENGTH: 'length',
+    RULE_ILLEGAL_CHAR: 'illegal_char',
+    RULE_YEAR_CODE: 'year_code',
+    RULE_CHECK_DIGIT: 'check_digit',
+}
+
+
+class ValidationResult(namedtuple('ValidationResult',
+                                  'failed illegal_positions expected_check_digit')):
+    """
+    Why a VIN is or isn't valid: failed is the RULE_* bits of the rules it
+    breaks, 0 if none; illegal_positions the positions, from 0, of any
+    characters that may not appear in a VIN; and expected_check_digit the
+    check digit the rest of the VIN calls for, or None if it can't be
+    worked out because the length is wrong or there are illegal characters.
+    """
+    __slots__ = ()
+
+    @property
+    def valid(self):
+        return not self.failed
+
+    @property
+    def rules(self):
+        """
+        Returns the names of the rules the VIN breaks.
+        """
+        return [RULE_NAMES[rule] for rule in sorted(RULE_NAMES) if self.failed & rule]
+
 
 class Vin(object):
+    # Lookups are memoized; slicing is cheap enough to redo on each access.
+    # The VIN is not expected to change after construction.
+    __slots__ = ('vin', '_wmi_info', '_is_valid', '_year')
+
     def __init__(self, vin):
         self.vin = vin.upper()
+        self._wmi_info = self._is_valid = self._year = None
+
+    def __reduce__(self):
+        return (Vin, (self.vin,))
 
     @property
-    def country(self):
+    def wmi_info(self):
         """
-        Returns the World Manufacturer's Country.
+        Returns the shared WmiInfo for this VIN's manufacturer.
         """
-        countries = WORLD_MANUFACTURER_MAP[self.vin[0]]['countries']
+        if self._wmi_info is None:
+            wmi = self.vin[:3]
+            info = wmi_cache.get(wmi)
+            if info is None:
+                manufacturer, make, brand_codes = lookup_wmi(wmi)
+                info = wmi_cache.put(wmi, WmiInfo(
+                    REGIONS.get(wmi[:1], 'Unknown'), COUNTRIES.get(wmi[:2], 'Unknown'),
+                    manufacturer, make, brand_codes))
+            if info.brand_codes is not None:
+                info = self._branded(info)
+            self._wmi_info = info
+        return self._wmi_info
 
-        for codes in countries:
-            if self.vin[1] in codes:
-                return countries[codes]
+    def _branded(self, info):
+        """
+        Returns the WmiInfo for the brand named further into the VIN, or
+        info if there is none.
+        """
+        first_year, start, end, brands = info.brand_codes
+        brand = self.vin[start:end]
+        if brand not in brands:
+            return info
+        if first_year is not None:
+            # Without a model year, there's no telling whether the brand
+            # code applies
+            try:
+                year = self.year
+            except (IndexError, KeyError):
+                return info
+            if year < first_year:
+                return info
+        key = (self.vin[:3], brand)
+        branded = wmi_cache.get(key)
+        if branded is None:
+            branded = wmi_cache.put(key, info._replace(make=brands[brand]))
+        return branded
 
-        return 'Unknown'
+    @property
+    def country(self):
+        """
+        Returns the World Manufacturer's Country.
+        """
+        return (self._wmi_info or self.wmi_info).country
 
     def decode(self):
         return self.vin
@@ -47,42 +149,15 @@ class Vin(object):
         """
         Returns True if a VIN is valid, otherwise returns False.
         """
-        if len(self.vin) != 17:
-            """
-            For model years 1981 to present, the VIN is composed of 17 
-            alphanumeric values
-            """
-            return False
-
-        if any(x in 'IOQ' for x in self.vin):
-            """ 
-            The letters I,O, Q are prohibited from any VIN position 
-            """
-            return False
-
-        if self.vin[9] in 'UZ0':
-            """
-            The tenth position of the VIN represents the Model Year and 
-            does not permit the use of the characters U and Z, as well 
-            as the numeric zero (0)
-            """
-            return False
-        
-        products = [VIN_WEIGHT[i] * VIN_TRANSLATION[j] for i, j in enumerate(self.vin)]
-        check_digit = sum(products) % 11
-        if check_digit == 10:
-            check_digit = 'X'
-
-        if self.vin[8] != str(check_digit):
-            """
-            The ninth position of the VIN is a calculated value based on 
-            the other 16 alphanumeric values, it's called the 
-            "Check Digit". The result of the check digit can ONLY be a 
-            numeric 0-9 or letter "X".
-            """
-            return False
+        if self._is_valid is None:
+            self._is_valid = is_valid_vin(self.vin)
+        return self._is_valid
 
-        return True
+    def validate(self):
+        """
+        Returns a ValidationResult saying which rules the VIN breaks.
+        """
+        return ValidationResult(*_check(self.vin))
 
     @property
     def less_than_500_built_per_year(self):
@@ -98,9 +173,10 @@ class Vin(object):
     @property
     def region(self):
         """
-        Returns the World Manufacturer's Region. Possible results:
+        Returns the World Manufacturer's Region, or 'Unknown' if the
+        first character isn't a known one, as country does.
         """
-        return WORLD_MANUFACTURER_MAP[self.vin[0]]['region']
+        return (self._wmi_info or self.wmi_info).region
 
     @property
     def vis(self):
@@ -128,6 +204,15 @@ class Vin(object):
         else:
             return self.vin[-6:]
 
+    @property
+    def squish(self):
+        """
+        Returns the VIN without its check digit and Vehicle Sequential
+        Number, which is the same for every vehicle of a model built at
+        one plant in one model year
+        """
+        return self.vin[:8] + self.vin[9:-len(self.vsn)]
+
     @property
     def wmi(self):
         """
@@ -138,70 +223,256 @@ class Vin(object):
 
     @property
     def manufacturer(self):
-        wmi = self.wmi
-        if wmi[:3] in WMI_MAP:
-            return WMI_MAP[wmi[:3]]
-        if wmi[:2] in WMI_MAP:
-            return WMI_MAP[wmi[:2]]
-        return 'Unknown'
+        return (self._wmi_info or self.wmi_info).manufacturer
 
     @property
     def make(self):
         '''
         This is like manufacturer, but without country or other suffixes, and should be short common name.
         Should be same as values from e.g. http://www.fueleconomy.gov/ws/rest/vehicle/menu/make?year=2012
-        Should probably have a static table instead of doing late fixup like this.
+        The make for each WMI is worked out ahead of time in libvin.tables;
+        brands encoded further into the VIN come from BRAND_CODES.
         '''
-        man = self.manufacturer
-        for suffix in [
-           'Canada',
-           'Cars',
-           'France',
-           'Hungary',
-           'Mexico',
-           'Motor Company',
-           'Truck USA',
-           'Turkey',
-           'USA',
-           'USA - trucks',
-           ]:
-             if man.endswith(suffix):
-                man = man.replace(" %s" % suffix, "")
-        if man == "General Motors":
-            return "GMC"
-        make = man
-        # 2012 and later: first 3 positions became overloaded, some 'make' aka brand info moved further in; see
-        # https://en.wikibooks.org/wiki/Vehicle_Identification_Numbers_(VIN_codes)/Chrysler/VIN_Codes
-        # http://www.allpar.com/mopar/vin-decoder.html
-        if self.year > 2011:
-            if man == 'Chrysler':
-                brandcode = self.vin[4]
-                if brandcode == 'D':
-                    make = 'Dodge'
-                if brandcode == 'F':
-                    make = 'Fiat'
-                if brandcode == 'J':
-                    make = 'Jeep'
-        if man == 'Nissan':
-            # FIXME: this was gathered from just four test cases, probably needs updating
-            brandcode = self.vin[3:5]
-            if brandcode == 'CV':
-                make = 'Infiniti'
-            if brandcode == 'BS':
-                make = 'Infiniti'
-            if brandcode == 'CS':
-                make = 'Infiniti'
-        return make
+        return (self._wmi_info or self.wmi_info).make
 
     @property
     def year(self):
         """
         Returns the model year of the vehicle
         """
-        if self.is_pre_2010:
-            return YEARS_CODES_PRE_2010[self.vin[9]]
-        else:
-            return YEARS_CODES_PRE_2040[self.vin[9]]
+        if self._year is None:
+            if self.is_pre_2010:
+                self._year = YEARS_CODES_PRE_2010[self.vin[9]]
+            else:
+                self._year = YEARS_CODES_PRE_2040[self.vin[9]]
+        return self._year
+
+
+def _weighted_tables():
+    """
+    Returns, for each position, a dict mapping each character allowed
+    there (in either case, and as a byte value) to its contribution to
+    the check digit sum.  The check digit itself counts as minus its
+    value, so a VIN is valid when the sum is a multiple of 11.
+    """
+    tables = []
+    for position, weight in enumerate(VIN_WEIGHT):
+        table = {}
+        for char, value in VIN_TRANSLATION.items():
+            if position == 8:
+                # The check digit can only be 0-9 or X, for 10
+                if char not in _CHECK_CHARS:
+                    continue
+                value = -_CHECK_CHARS.index(char)
+            elif position == 9 and char in 'UZ0':
+                # Not used for model years
+                continue
+            else:
+                value *= weight
+            for key in (char, char.lower()):
+                table[key] = table[ord(key)] = value
+        tables.append(table)
+    return tables
+
+_CHECK_CHARS = '0123456789X'
+# I, O and Q appear in none of these, as they are prohibited everywhere
+_WEIGHTED = _weighted_tables()
+# Their get methods, bound once
+_WEIGHTED_GETS = [table.get for table in _WEIGHTED]
+
+
+def is_valid_vin(vin):
+    """
+    Returns True if vin, a string or bytes in either case, is a valid VIN,
+    the same as Vin(vin).is_valid but without making a Vin.  Stops at the
+    first character that can't appear where it is.
+    """
+    if len(vin) != 17:
+        return False
+    total = 0
+    for get, char in zip(_WEIGHTED_GETS, vin):
+        value = get(char)
+        if value is None:
+            return False
+        total += value
+    return total % 11 == 0
+
+
+def _check(vin):
+    """
+    Returns (failed, illegal_positions, expected_check_digit) for an
+    upper case VIN string, as for ValidationResult, in one pass.
+    """
+    failed = 0 if len(vin) == 17 else RULE_LENGTH
+    illegal = []
+    total = 0
+    for position, char in enumerate(vin):
+        value = VIN_TRANSLATION.get(char)
+        if value is None:
+            illegal.append(position)
+        elif position < 17:
+            total += VIN_WEIGHT[position] * value
+    if illegal:
+        failed |= RULE_ILLEGAL_CHAR
+    expected = None
+    if not failed & RULE_LENGTH:
+        if vin[9] in 'UZ0':
+            failed |= RULE_YEAR_CODE
+        # The check digit's own weight is 0
+        if not illegal or illegal == [8]:
+            expected = _CHECK_CHARS[total % 11]
+            if vin[8] != expected:
+                failed |= RULE_CHECK_DIGIT
+    return failed, tuple(illegal), expected
+
+
+def count_failures(vins):
+    """
+    Counts how many of an iterable of VIN strings break each rule, without
+    keeping anything per VIN.  Returns a Counter holding the total number
+    of VINs, the number that are valid, and the number that break each
+    rule, keyed by 'total', 'valid' and the RULE_NAMES.  A VIN breaking
+    several rules counts towards each.
+    """
+    counts = Counter(dict.fromkeys(['total', 'valid'] + list(RULE_NAMES.values()), 0))
+    masks = Counter()
+    total = 0
+    for vin in vins:
+        total += 1
+        if not is_valid_vin(vin):
+            masks[_check(vin.upper())[0]] += 1
+    counts['total'] = total
+    counts['valid'] = total - sum(masks.values())
+    for mask, count in masks.items():
+        for rule, name in RULE_NAMES.items():
+            if mask & rule:
+                counts[name] += count
+    return counts
+
+
+class DecodedVin(namedtuple('DecodedVin',
+                            'vin region country manufacturer make year is_valid')):
+    """
+    The properties of a Vin, as returned by decode_cached().  year is None
+    where Vin's would raise.  The sections of the VIN are sliced from it
+    when read, as Vin does, so a record holds nothing but the VIN itself
+    and values shared with other records.
+    """
+    __slots__ = ()
+
+    wmi = Vin.wmi
+    vds = Vin.vds
+    vis = Vin.vis
+    vsn = Vin.vsn
+    squish = Vin.squish
+    is_pre_2010 = Vin.is_pre_2010
+    less_than_500_built_per_year = Vin.less_than_500_built_per_year
+
+    def __sizeof__(self):
+        # The VIN is the only object a record doesn't share
+        return tuple.__sizeof__(self) + sys.getsizeof(self.vin)
+
+
+def _decoded(vin):
+    v = Vin(vin)
+    try:
+        year = v.year
+    except (IndexError, KeyError):
+        year = None
+    # Brand codes that depend on the year are ignored when it's unknown
+    info = v.wmi_info
+    return DecodedVin(v.vin, info.region, info.country, info.manufacturer, info.make,
+                      year, v.is_valid)
+
+
+def decode_cached(vin):
+    """
+    Returns a DecodedVin for vin, ignoring case and surrounding spaces.
+    Records are kept in decode_cache, so a VIN seen again is looked up
+    rather than decoded, and every caller gets the same record.  Safe to
+    call from several threads.  decode_cache.stats() counts the hits and
+    misses, and decode_cache.footprint() estimates the memory it holds.
+    """
+    key = vin.strip().upper()
+    record = decode_cache.get(key)
+    if record is None:
+        record = decode_cache.put(key, _decoded(key))
+    return record
+
+
+class VinDecoder(object):
+    """
+    Decodes VINs to DecodedVin records, caching up to maxsize of them, and
+    is meant to be shared by every thread of a server.  The cache is split
+    into stripes, each an LRUCache, picked by the hash of the VIN: lookups
+    take no lock, and a thread storing a new record only locks its stripe.
+    Manufacturer details come from the module's wmi_cache, as for Vin,
+    which is shared by every decoder and is just as safe to share.
+    """
+
+    def __init__(self, maxsize=65536, stripes=16):
+        if not 1 <= stripes <= maxsize:
+            raise ValueError("stripes must be between 1 and maxsize")
+        self.maxsize = maxsize
+        # The first maxsize % stripes stripes hold one extra entry
+        self._stripes = tuple(LRUCache(maxsize // stripes + (i < maxsize % stripes))
+                              for i in range(stripes))
+
+    def decode(self, vin):
+        """
+        Returns the DecodedVin for vin, ignoring case and surrounding
+        spaces.  Every thread gets the same record for the same VIN while
+        it stays cached.
+        """
+        key = vin.strip().upper()
+        stripe = self._stripes[hash(key) % len(self._stripes)]
+        record = stripe.get(key)
+        if record is None:
+            record = stripe.put(key, _decoded(key))
+        return record
+
+    def decode_many(self, vins):
+        """
+        Returns [self.decode(vin) for vin in vins].
+        """
+        return [self.decode(vin) for vin in vins]
+
+    def is_valid(self, vin):
+        """
+        Returns whether vin is valid, ignoring case and surrounding
+        spaces as decode() does, without caching anything.
+        """
+        return is_valid_vin(vin.strip())
+
+    def validate(self, vin):
+        """
+        Returns Vin(vin).validate(), without caching anything.
+        """
+        return ValidationResult(*_check(vin.strip().upper()))
+
+    def clear(self):
+        """
+        Empties the cache and resets its counters.
+        """
+        for stripe in self._stripes:
+            stripe.clear()
+
+    def footprint(self):
+        """
+        Returns roughly how many bytes the cache holds.
+        """
+        return sum(stripe.footprint() for stripe in self._stripes)
+
+    def stats(self):
+        """
+        Returns a CacheStats tuple of the counters and size, summed over
+        the stripes.
+        """
+        totals = [0] * 4
+        for stripe in self._stripes:
+            for i, value in enumerate(stripe.stats()[:4]):
+                totals[i] += value
+        return CacheStats(*(totals + [self.maxsize]))
 
 
 def decode(vin):
@@ -0,0 +1,150 @@
+"""
+Sorted index of packed VINs
+
+VinIndex keeps a set of VINs packed as by libvin.batch.pack_many() and
+sorted, 12 bytes per VIN, and finds those matching a pattern, such as a
+WMI or a libvin.patterns mask over the WMI and VDS, and optionally a
+range of model years.  The characters the pattern fixes before its
+first open position pick out a contiguous run of the index by binary
+search; only that run is tested against the rest of the pattern and the
+years, and then as whole arrays.
+
+An index can be saved to a .npy file and loaded again memory-mapped, so
+processes share it through the page cache and start instantly:
+
+    >>> index = VinIndex.build(vins)
+    >>> index.save('inventory.npy')
+    >>> index = VinIndex.load('inventory.npy')
+    >>> index.find('1GK', first_year=2008, last_year=2008)
+"""
+
+import numpy as np
+
+from libvin.batch import PACKED_DTYPE, match_many, pack_many, packed_digits, unpack_many
+from libvin.codes import YEARS_CODES_PRE_2010, YEARS_CODES_PRE_2040
+from libvin.packing import ALPHABET, pack_vin
+from libvin.patterns import VinPattern
+
+_LOW_BASE = 33 ** 5
+
+# (is_pre_2010, digit of position 10) -> model year, or 0 for codes that
+# aren't years.  Position 7 is a digit, and so the year before 2010, when
+# its digit value is under 10.
+_YEARS = np.zeros((2, 33), dtype=np.int16)
+for _codes, _pre_2010 in ((YEARS_CODES_PRE_2040, 0), (YEARS_CODES_PRE_2010, 1)):
+    for _char, _year in _codes.items():
+        _YEARS[_pre_2010, ALPHABET.index(_char)] = _year
+
+
+def _key(vin):
+    """
+    Returns vin packed into a 12 byte string that sorts as the index does.
+    """
+    high, low = divmod(pack_vin(vin), _LOW_BASE)
+    return np.array([(high, low)], dtype=PACKED_DTYPE).view('S12')[0]
+
+
+class VinIndex(object):
+    """
+    Sorted, packed VINs, from build() or load().  Duplicates are kept.
+    Read-only, so safe to share between threads.
+    """
+
+    def __init__(self, packed):
+        if packed.dtype != PACKED_DTYPE or packed.ndim != 1:
+            raise ValueError("not an array of PACKED_DTYPE")
+        self.packed = packed
+        self._keys = packed.view('S12')
+
+    @classmethod
+    def build(cls, vins):
+        """
+        Returns an index of a sequence of VIN strings, or of a
+        PACKED_DTYPE array.  Raises ValueError for values that aren't 17
+        VIN characters; check digits aren't checked.
+        """
+        if not (isinstance(vins, np.ndarray) and vins.dtype == PACKED_DTYPE):
+            vins = pack_many(vins)
+        return cls(np.sort(vins.view('S12')).view(PACKED_DTYPE))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Returns the index saved at path, memory-mapped unless mmap is
+        False.
+        """
+        return cls(np.load(path, mmap_mode='r' if mmap else None))
+
+    def save(self, path):
+        """
+        Saves the index to path as a .npy file.
+        """
+        with open(path, 'wb') as f:
+            np.save(f, self.packed)
+
+    def __len__(self):
+        return len(self.packed)
+
+    def _bounds(self, prefix):
+        """
+        Returns (start, stop): the rows whose VINs start with prefix.
+        """
+        rest = 17 - len(prefix)
+        return (self._keys.searchsorted(_key(prefix + '0' * rest), 'left'),
+                self._keys.searchsorted(_key(prefix + 'Z' * rest), 'right'))
+
+    def rows(self, pattern='', first_year=None, last_year=None):
+        """
+        Returns the positions in the index of the VINs matching pattern
+        and made in the given range of model years, in order.
+
+        pattern is a libvin.patterns.VinPattern or a mask, such as
+        '1GK?V1' or '1G[1-4]', matched against the start of each VIN.
+        Either year may be None to leave the range open on that side.
+        VINs whose year code isn't one only match when neither year is
+        given.
+        """
+        if not isinstance(pattern, VinPattern):
+            pattern = VinPattern(pattern)
+        prefix = pattern.prefix()
+        start, stop = self._bounds(prefix)
+        candidates = self.packed[start:stop]
+        match = None
+        # The candidates all start with prefix, so only the rest is tested
+        if any(position >= len(prefix) for position, bits in pattern.checks):
+            match = match_many(pattern, candidates, start=len(prefix))
+        if first_year is not None or last_year is not None:
+            pre_2010 = (packed_digits(candidates, 6) < 10).view(np.uint8)
+            years = _YEARS[pre_2010, packed_digits(candidates, 9)]
+            found = years > 0
+            if first_year is not None:
+                found &= years >= first_year
+            if last_year is not None:
+                found &= years <= last_year
+            match = found if match is None else match & found
+        if match is None:
+            return np.arange(start, stop)
+        return start + np.flatnonzero(match)
+
+    def find(self, pattern='', first_year=None, last_year=None):
+        """
+        Returns the VINs matching pattern and years, as for rows(), as an
+        array of 17 byte strings in sorted order.
+        """
+        return unpack_many(self.packed[self.rows(pattern, first_year, last_year)])
+
+    def count(self, pattern='', first_year=None, last_year=None):
+        """
+        Returns the number of VINs matching pattern and years, as for
+        rows().
+        """
+        return len(self.rows(pattern, first_year, last_year))
+
+    def __contains__(self, vin):
+        if len(vin) != 17:
+            return False
+        try:
+            start, stop = self._bounds(vin.upper())
+        except ValueError:
+            return False
+        return stop > start
@@ -0,0 +1,120 @@
+"""
+Bounded cache with hit, miss and eviction counters
+
+Entries are evicted in approximately least-recently-used order using the
+CLOCK algorithm: a hit only sets a flag on the entry, so reads need no
+lock and no reordering, and an insert into a full cache sweeps past
+recently used entries (clearing their flags) to the first one that
+hasn't been used since the last sweep.
+"""
+
+import sys
+from collections import namedtuple
+from threading import Lock
+
+
+class CacheStats(namedtuple('CacheStats', 'hits misses evictions size maxsize')):
+    __slots__ = ()
+
+    @property
+    def hit_ratio(self):
+        """
+        Returns the fraction of lookups that were hits, or 0.0 if there
+        have been none.
+        """
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+# Fields of an entry
+_VALUE, _USED = 0, 1
+
+
+class LRUCache(object):
+    """
+    Maps keys to values, holding at most maxsize entries.  Safe to share
+    between threads; under heavy contention the counters may undercount
+    slightly, as they are updated without a lock.
+    """
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._lock = Lock()
+        self._entries = {}
+        # Keys in the order the clock hand visits them
+        self._ring = []
+        self._hand = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Returns the value for key, or default if it isn't cached.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        entry[_USED] = True
+        return entry[_VALUE]
+
+    def put(self, key, value):
+        """
+        Caches value for key, evicting an entry if the cache is full.
+        If key is already cached, it keeps its value.  Returns the value
+        now cached for key.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry[_VALUE]
+            if len(self._ring) < self.maxsize:
+                self._ring.append(key)
+            else:
+                ring, entries, hand = self._ring, self._entries, self._hand
+                while entries[ring[hand]][_USED]:
+                    entries[ring[hand]][_USED] = False
+                    hand = (hand + 1) % self.maxsize
+                del entries[ring[hand]]
+                ring[hand] = key
+                self._hand = (hand + 1) % self.maxsize
+                self.evictions += 1
+            self._entries[key] = [value, True]
+            return value
+
+    def clear(self):
+        """
+        Empties the cache and resets its counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            del self._ring[:]
+            self._hand = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def footprint(self, sizeof=sys.getsizeof):
+        """
+        Returns roughly how many bytes the cache holds: its own structures,
+        plus sizeof() of each key and value.  An object shared between
+        entries, or between a key and its value, is counted each time.
+        """
+        with self._lock:
+            entries = list(self._entries.items())
+            size = sys.getsizeof(self._entries) + sys.getsizeof(self._ring)
+        for key, entry in entries:
+            size += sys.getsizeof(entry) + sizeof(key) + sizeof(entry[_VALUE])
+        return size
+
+    def stats(self):
+        """
+        Returns a CacheStats tuple of the counters and current size.
+        """
+        return CacheStats(self.hits, self.misses, self.evictions,
+                          len(self._entries), self.maxsize)
@@ -0,0 +1,245 @@
+"""
+Lookup tables compiled to a memory-mapped file
+
+libvin.tables normally builds its tables from libvin.static in every
+process that imports it.  This module writes the same tables to a file
+of sorted fixed-size records, searched in place through mmap, so
+processes share one copy in the page cache and have nothing to build.
+To use one, build it and point LIBVIN_TABLES at it before importing
+libvin:
+
+    python -m libvin.mapped /var/lib/libvin/wmi.table
+    export LIBVIN_TABLES=/var/lib/libvin/wmi.table
+
+The file records a checksum of the libvin.static data the tables are
+built from, and MappedWmiTable refuses a file whose checksum doesn't
+match the installed libvin's; rebuild it after changing libvin.static
+or upgrading libvin.
+
+Layout, little-endian: a header (magic, WMI, country, region and string
+counts, checksum), then one record per WMI sorted by key (the WMI, NUL
+padded to three bytes, then the string numbers of its manufacturer and
+make), then the same for the two character country and one character
+region keys (with the second string number unused), then the string
+offsets, then the UTF-8 strings.
+"""
+
+import binascii
+import mmap
+import struct
+import sys
+
+from libvin.codes import BRAND_CODES
+
+_MAGIC = b'LVW2'
+_HEADER = struct.Struct('<4sIIIII')
+_RECORD = struct.Struct('<3sxHH')
+_OFFSET = struct.Struct('<I')
+
+
+def _key(wmi):
+    return wmi.encode('ascii').ljust(3, b'\0')
+
+
+def tables_checksum():
+    """
+    Returns the CRC-32 of the libvin.static data libvin.tables compiles
+    its tables from, which a table file must have been written from.
+    (Only meant to catch files left over from other data; hashlib would
+    take longer to import than the mapped tables save.)
+    """
+    from libvin.static import MAKE_RENAMES, MAKE_SUFFIXES, WMI_MAP, WORLD_MANUFACTURER_MAP
+    lines = ['%s %s' % item for item in sorted(WMI_MAP.items())]
+    for first, info in sorted(WORLD_MANUFACTURER_MAP.items()):
+        lines.append('%s %s' % (first, info['region']))
+        lines.extend('%s%s %s' % (first, codes, country)
+                     for codes, country in sorted(info['countries'].items()))
+    lines.extend(MAKE_SUFFIXES)
+    lines.extend('%s %s' % item for item in sorted(MAKE_RENAMES.items()))
+    data = '\n'.join(lines)
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return binascii.crc32(data) & 0xffffffff
+
+
+def write_wmi_table(path, wmis, countries=None, regions=None):
+    """
+    Writes a dict mapping WMIs of two or three characters to
+    (manufacturer, make, ...) tuples, such as libvin.tables.WMIS, and
+    optionally dicts like libvin.tables.COUNTRIES and REGIONS, to a file
+    MappedWmiTable can read.
+    """
+    countries = countries or {}
+    regions = regions or {}
+    strings = set(name for entry in wmis.values() for name in entry[:2])
+    strings.update(countries.values())
+    strings.update(regions.values())
+    strings = sorted(strings)
+    if len(strings) > 0xffff:
+        raise ValueError("too many distinct names: %d" % len(strings))
+    number = dict((name, i) for i, name in enumerate(strings))
+    encoded = [name.encode('utf-8') for name in strings]
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(wmis), len(countries), len(regions),
+                             len(strings), tables_checksum()))
+        for key, wmi in sorted((_key(wmi), wmi) for wmi in wmis):
+            manufacturer, make = wmis[wmi][:2]
+            f.write(_RECORD.pack(key, number[manufacturer], number[make]))
+        for names in (countries, regions):
+            for key, code in sorted((_key(code), code) for code in names):
+                f.write(_RECORD.pack(key, number[names[code]], 0))
+        offset = 0
+        for data in encoded:
+            f.write(_OFFSET.pack(offset))
+            offset += len(data)
+        f.write(_OFFSET.pack(offset))
+        f.write(b''.join(encoded))
+
+
+class _MappedNames(object):
+    """
+    Read-only mapping from a code to a name, like libvin.tables.COUNTRIES
+    or REGIONS, backed by a section of a MappedWmiTable's file.
+    """
+
+    def __init__(self, table, start, count):
+        self._table = table
+        self._start = start
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, code):
+        return self.get(code) is not None
+
+    def __getitem__(self, code):
+        name = self.get(code)
+        if name is None:
+            raise KeyError(code)
+        return name
+
+    def get(self, code, default=None):
+        """
+        Returns the name for code, or default if there is none.
+        """
+        offset = self._table._find(code, self._start, self._count)
+        if offset is None:
+            return default
+        return self._table._name(_RECORD.unpack_from(self._table._data, offset)[1])
+
+
+class MappedWmiTable(object):
+    """
+    Read-only mapping from WMI to (manufacturer, make, BRAND_CODES rule
+    for the make or None), like libvin.tables.WMIS, backed by a file
+    written by write_wmi_table().  countries and regions map codes to
+    names like libvin.tables.COUNTRIES and REGIONS.
+
+    Raises ValueError if path isn't a table file, or was written from
+    different data than the installed libvin's, and IOError or OSError
+    if it can't be read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, count, ncountries, nregions, nstrings, checksum = \
+                _HEADER.unpack_from(self._data, 0)
+        except struct.error:
+            magic = None
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError("%s is not a libvin WMI table" % path)
+        if checksum != tables_checksum():
+            self.close()
+            raise ValueError("%s is out of date; rebuild it with python -m libvin.mapped"
+                             % path)
+        self._count = count
+        start = _HEADER.size + count * _RECORD.size
+        self.countries = _MappedNames(self, start, ncountries)
+        start += ncountries * _RECORD.size
+        self.regions = _MappedNames(self, start, nregions)
+        self._offsets = start + nregions * _RECORD.size
+        self._strings = self._offsets + (nstrings + 1) * _OFFSET.size
+        # String number -> decoded string, filled in as they are used
+        self._names = {}
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, wmi):
+        return self._find(wmi, _HEADER.size, self._count) is not None
+
+    def __getitem__(self, wmi):
+        entry = self.get(wmi)
+        if entry is None:
+            raise KeyError(wmi)
+        return entry
+
+    def close(self):
+        self._data.close()
+
+    def _find(self, code, start, count):
+        """
+        Returns the offset of code's record among the count starting at
+        offset start, or None.
+        """
+        if not 1 <= len(code) <= 3:
+            return None
+        try:
+            key = _key(code)
+        except UnicodeError:
+            return None
+        data, size = self._data, _RECORD.size
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = start + mid * size
+            found = data[offset:offset + 3]
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                return offset
+        return None
+
+    def _name(self, number):
+        name = self._names.get(number)
+        if name is None:
+            start, end = struct.unpack_from(
+                '<II', self._data, self._offsets + number * _OFFSET.size)
+            name = self._data[self._strings + start:self._strings + end].decode('utf-8')
+            self._names[number] = name
+        return name
+
+    def get(self, wmi, default=None):
+        """
+        Returns the entry for wmi, or default if there is none.
+        """
+        offset = self._find(wmi, _HEADER.size, self._count)
+        if offset is None:
+            return default
+        manufacturer, make = _RECORD.unpack_from(self._data, offset)[1:]
+        make = self._name(make)
+        return (self._name(manufacturer), make, BRAND_CODES.get(make))
+
+
+def main(argv=None):
+    from libvin.tables import compile_countries, compile_regions, compile_wmis
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        sys.stderr.write("usage: python -m libvin.mapped OUTPUT\n")
+        return 2
+    wmis = compile_wmis()
+    write_wmi_table(argv[0], wmis, compile_countries(), compile_regions())
+    sys.stderr.write("libvin.mapped: wrote %d WMIs to %s\n" % (len(wmis), argv[0]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,9 +4,284 @@ Fetch a VIN record from NHTSA
 License: AGPL v3.0
 """
 
-# Note: client app may wish to 'import requests_cache' and install a cache
-# to avoid duplicate fetches
+# Note: pass NhtsaClient a libvin.nhtsa_cache.NhtsaCache to avoid
+# duplicate fetches
+import logging
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from libvin.nhtsa_cache import lookup_key
+
+log = logging.getLogger(__name__)
+
+NHTSA_URL = 'https://vpic.nhtsa.dot.gov/api/vehicles/'
+
+# Most VINs DecodeVINValuesBatch accepts per request
+BATCH_SIZE = 50
+
+
+# Responses meaning the server is busy, which are worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def shared_result(result, vin):
+    """
+    Returns a copy of result, fetched for another VIN with the same
+    lookup key, as the result for vin.
+    """
+    result = dict(result)
+    if 'VIN' in result:
+        result['VIN'] = vin
+    return result
+
+
+def _strip(results):
+    # Strip trailing spaces (as in 'Hummer ')
+    for key in results:
+        if hasattr(results[key], 'rstrip'):
+            results[key] = results[key].rstrip()
+    return results
+
+
+class RateLimiter(object):
+    """
+    Spaces out calls to wait() from any number of threads so that no
+    more than per_second of them return in any second.
+    """
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def wait(self):
+        with self._lock:
+            now = time.time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class NhtsaClient(object):
+    '''
+    Client for vpic.nhtsa.dot.gov that reuses pooled connections, times
+    out and retries failed requests, and decodes many VINs concurrently
+    using the batch endpoint.  Safe to share between threads.
+
+    base_url can point at another server with the same API, such as a
+    local stub for testing.  workers bounds the number of requests in
+    flight at once, and max_per_second, if set, the request rate.
+    Connection failures and busy responses are retried up to retries
+    times, backing off for backoff_factor seconds, then twice that, and
+    so on; retries count towards max_per_second and requests_made like
+    any other request.
+    cache, if given, is a libvin.nhtsa_cache.NhtsaCache (or anything
+    with the same get_many and put_many methods); VINs found in it are
+    not fetched, and fetched results are stored in it.
+
+    decode_batch() looks up each distinct VIN once, or with by_pattern,
+    each distinct lookup_key(), sharing the result with the other VINs
+    that have it; lookups_saved counts the VINs that shared a result
+    instead of being fetched.
+    '''
+
+    backoff_factor = 0.5
+
+    def __init__(self, base_url=NHTSA_URL, timeout=30, retries=3, workers=4,
+                 max_per_second=None, cache=None, by_pattern=False):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.timeout = timeout
+        self.retries = retries
+        self.workers = workers
+        self.cache = cache
+        self.by_pattern = by_pattern
+        self.requests_made = 0
+        self.lookups_saved = 0
+        self._count_lock = threading.Lock()
+        self._limiter = RateLimiter(max_per_second) if max_per_second else None
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.session = requests.Session()
+        # Retried in _request rather than by urllib3, so that every
+        # attempt waits its turn under max_per_second
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Shuts down the worker threads and closes pooled connections.
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+        self.session.close()
+
+    def _request(self, method, path, **kwargs):
+        """
+        Returns the Results list of a vPIC API call, or None on error.
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff_factor * 2 ** (attempt - 1))
+            last = attempt == self.retries
+            if self._limiter is not None:
+                self._limiter.wait()
+            with self._count_lock:
+                self.requests_made += 1
+            try:
+                r = self.session.request(method, self.base_url + path,
+                                         timeout=self.timeout, **kwargs)
+                if r.status_code in RETRY_STATUSES and not last:
+                    r.close()
+                    continue
+                r.raise_for_status()
+                return r.json()['Results']
+            except requests.Timeout:
+                if not last:
+                    continue
+                log.warning("nhtsa: connection timed out")
+            except requests.ConnectionError:
+                if not last:
+                    continue
+                log.warning("nhtsa: connection failed")
+            except requests.RequestException as e:
+                log.warning("nhtsa: request failed: %s", e)
+            except (ValueError, KeyError, TypeError):
+                log.warning("nhtsa: could not parse result")
+            return None
+
+    def decode(self, vin):
+        '''
+        Return vpic.nhtsa.dot.gov's interpretation of the VIN in a dictionary, or None on error.
+        See nhtsa_decode().
+        '''
+        if self.cache is not None:
+            result = self.cache.get_many([vin])[0]
+            if result is not None:
+                return result
+        results = self._request('GET', 'decodevinvalues/' + vin,
+                                params={'format': 'json'})
+        if not results:
+            return None
+        result = _strip(results[0])
+        if self.cache is not None:
+            self.cache.put_many([(vin, result)])
+        return result
+
+    def decode_group(self, vins):
+        '''
+        Return vpic.nhtsa.dot.gov's interpretation of up to BATCH_SIZE VINs,
+        fetched with a single request, as for decode_batch().  Doesn't
+        consult the cache, but stores what it fetches there.
+        '''
+        results = self._request('POST', 'DecodeVINValuesBatch/',
+                                data={'format': 'json', 'data': ';'.join(vins)})
+        if results is None or len(results) != len(vins):
+            if results is not None:
+                log.warning("nhtsa: expected %d results, got %d", len(vins), len(results))
+            return [None] * len(vins)
+        results = [_strip(result) for result in results]
+        if self.cache is not None:
+            self.cache.put_many(zip(vins, results))
+        return results
+
+    def _map(self, func, items):
+        """
+        Returns [func(item) for item in items], running up to self.workers
+        calls at once.
+        """
+        if len(items) <= 1 or self.workers <= 1:
+            return [func(item) for item in items]
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self.workers)
+            pool = self._pool
+        return pool.map(func, items)
+
+    def decode_batch(self, vins):
+        '''
+        Return a list holding vpic.nhtsa.dot.gov's interpretation of each VIN,
+        in the same order, or None for VINs that couldn't be fetched.
+        Sends one VIN per lookup key not found in the cache, BATCH_SIZE
+        per request, with up to self.workers requests in flight at once.
+        '''
+        vins = list(vins)
+        decoded, unique, slots = self.plan(vins)
+        missing = [vins[i] for i in unique]
+        groups = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+        fetched = [result for results in self._map(self.decode_group, groups)
+                   for result in results]
+        shared = []
+        for i, j in slots:
+            decoded[i] = fetched[j]
+            if i != unique[j] and fetched[j] is not None:
+                decoded[i] = shared_result(fetched[j], vins[i])
+                shared.append((vins[i], decoded[i]))
+        if shared and self.cache is not None:
+            self.cache.put_many(shared)
+        return decoded
+
+    def plan(self, vins):
+        '''
+        Work out which of a list of VINs decode_batch() needs to fetch.
+        Returns (decoded, unique, slots): the cached result for each VIN,
+        or None; the index in vins of the first uncached VIN with each
+        lookup key; and for every uncached VIN, a pair of its index in
+        vins and the index in unique of the VIN whose result it takes.
+        '''
+        decoded = self.cached(vins)
+        first = {}
+        unique = []
+        slots = []
+        for i, (vin, result) in enumerate(zip(vins, decoded)):
+            if result is None:
+                key = lookup_key(vin, self.by_pattern)
+                if key not in first:
+                    first[key] = len(unique)
+                    unique.append(i)
+                slots.append((i, first[key]))
+        with self._count_lock:
+            self.lookups_saved += len(slots) - len(unique)
+        return decoded, unique, slots
+
+    def cached(self, vins):
+        '''
+        Return a list holding the cached result for each of vins, or None
+        for those that aren't cached (all of them, if there is no cache).
+        '''
+        if self.cache is None:
+            return [None] * len(vins)
+        return self.cache.get_many(vins)
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def default_client():
+    """
+    Returns the NhtsaClient used by nhtsa_decode(), creating it on first use.
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = NhtsaClient()
+        return _default_client
+
 
 def nhtsa_decode(vin):
     '''
@@ -26,26 +301,8 @@ def nhtsa_decode(vin):
     DriveType: Infiniti, Dodge, Mitsubishi
     Series: BMW, Dodge, Mitsubishi
     Trim: BMW, Dodge
-    '''
 
-    url = 'https://vpic.nhtsa.dot.gov/api/vehicles/decodevinvalues/' + vin + '?format=json'
-    try:
-        r = requests.get(url)
-    except requests.Timeout:
-        print "nhtsa: connection timed out"
-        return None
-    except requests.ConnectionError:
-        print "nhtsa: connection failed"
-        return None
-    try:
-        jresult = r.json()
-        results = jresult['Results'][0]
-    except ValueError:
-        print "nhtsa: could not parse result"
-        return None
-
-    # Strip trailing spaces (as in 'Hummer ')
-    for key in results:
-        results[key] = results[key].rstrip()
-
-    return results
+    Uses a shared NhtsaClient; create your own to change timeouts,
+    concurrency or the server, or to decode many VINs at once.
+    '''
+    return default_client().decode(vin)
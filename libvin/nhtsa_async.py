@@ -0,0 +1,150 @@
+"""
+asyncio interface to NHTSA lookups (Python 3.6 and later)
+
+The lookups themselves go through a libvin.nhtsa.NhtsaClient, with its
+connection pool and retries, on a private thread pool; awaiting them
+never blocks the event loop.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from libvin.nhtsa import BATCH_SIZE, NhtsaClient, shared_result
+
+
+def _release(loop, semaphore):
+    """
+    Releases semaphore, from any thread, unless its loop is closed.
+    """
+    try:
+        loop.call_soon_threadsafe(semaphore.release)
+    except RuntimeError:
+        pass
+
+
+class AsyncNhtsaClient(object):
+    '''
+    Awaitable counterpart of NhtsaClient.
+
+    concurrency bounds the number of requests in flight at once, and
+    timeout how many seconds to wait for each one, after which it counts
+    as failed.  Other keyword arguments are passed to NhtsaClient.
+    Cancelling a task that is awaiting a lookup abandons the lookup,
+    though it keeps its place among the concurrency until its thread
+    is done.
+    '''
+
+    def __init__(self, concurrency=10, timeout=30, **kwargs):
+        self.timeout = timeout
+        self.client = NhtsaClient(timeout=timeout, workers=concurrency, **kwargs)
+        self._executor = ThreadPoolExecutor(concurrency)
+        self._concurrency = concurrency
+        self._semaphore = None
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.client.close()
+
+    async def _call(self, func, *args):
+        """
+        Returns func(*args) run on the thread pool, or None if it takes
+        longer than self.timeout.
+        """
+        # The semaphore must belong to the running event loop, which may
+        # not be the one the client was first used from.
+        loop = asyncio.get_event_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+            self._loop = loop
+        semaphore = self._semaphore
+        await semaphore.acquire()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+        # Released when the thread is done, not when the wait for it
+        # times out or is cancelled, so no more than concurrency lookups
+        # ever run at once
+        future.add_done_callback(lambda _: _release(loop, semaphore))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def decode(self, vin):
+        '''
+        Return vpic.nhtsa.dot.gov's interpretation of the VIN in a dictionary, or None on error.
+        See libvin.nhtsa.nhtsa_decode().
+        '''
+        return await self._call(self.client.decode, vin)
+
+    async def decode_batch(self, vins):
+        '''
+        Return a list holding vpic.nhtsa.dot.gov's interpretation of each VIN,
+        in the same order, or None for VINs that couldn't be fetched.
+        Sends BATCH_SIZE VINs per request.
+        '''
+        decoded = []
+        async for result in self.decode_iter(vins):
+            decoded.append(result)
+        return decoded
+
+    async def decode_iter(self, vins):
+        '''
+        Yield vpic.nhtsa.dot.gov's interpretation of each VIN, or None, in
+        the same order as vins, starting as soon as the first batch is in.
+        Like NhtsaClient.decode_batch(), fetches only VINs not found in the
+        client's cache, one per lookup key.
+        '''
+        vins = list(vins)
+        decoded, unique, slots = await asyncio.get_event_loop().run_in_executor(
+            self._executor, self.client.plan, vins)
+        missing = [vins[i] for i in unique]
+        groups = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+        tasks = [asyncio.ensure_future(self._call(self.client.decode_group, group))
+                 for group in groups]
+        try:
+            sources = dict(slots)
+            pending = iter(zip(groups, tasks))
+            fetched = []
+            shared = []
+            for i, result in enumerate(decoded):
+                j = sources.get(i)
+                if j is not None:
+                    while len(fetched) <= j:
+                        group, task = next(pending)
+                        fetched.extend(await task or [None] * len(group))
+                    result = fetched[j]
+                    if i != unique[j] and result is not None:
+                        result = shared_result(result, vins[i])
+                        shared.append((vins[i], result))
+                yield result
+            if shared and self.client.cache is not None:
+                await asyncio.get_event_loop().run_in_executor(
+                    self._executor, self.client.cache.put_many, shared)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+_default_client = None
+
+
+async def nhtsa_decode_async(vin):
+    '''
+    Return vpic.nhtsa.dot.gov's interpretation of the VIN in a dictionary, or None on error.
+    Awaitable version of libvin.nhtsa.nhtsa_decode(), using a shared
+    AsyncNhtsaClient; create your own to set concurrency or timeouts.
+    '''
+    global _default_client
+    if _default_client is None:
+        _default_client = AsyncNhtsaClient()
+    return await _default_client.decode(vin)
@@ -0,0 +1,232 @@
+"""
+Persistent cache of vPIC results
+
+Keeps the dictionaries NhtsaClient fetches in an SQLite database, so
+they outlive the process and can be shared by several processes on one
+machine.  Entries expire after a time to live, and once the cache holds
+maxsize of them the least recently used are evicted.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from libvin.decoding import Vin
+from libvin.lru import CacheStats
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    stored REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+'''
+
+# SQLite limits the number of parameters in one statement
+_MAX_PARAMS = 500
+
+# The size is counted as entries are added and removed.  After maxsize
+# // _RECOUNT additions, expired entries are removed and the rest
+# counted again, to catch up with other processes sharing the database;
+# both take a scan of the table.
+_RECOUNT = 10
+
+
+def lookup_key(vin, by_pattern=False):
+    """
+    Returns a key that is the same for VINs vPIC says the same about:
+    the VIN itself, or with by_pattern, its Vin.squish.  VINs with the
+    wrong check digit are always keyed on themselves, since vPIC flags
+    the error in their results.
+    """
+    v = Vin(vin.strip())
+    if by_pattern and v.is_valid:
+        return v.squish
+    return v.vin
+
+
+class NhtsaCache(object):
+    """
+    Maps VINs to vPIC results, stored in the SQLite database at path
+    (by default, in memory).  Pass one to NhtsaClient(cache=...).
+
+    Entries older than ttl seconds are ignored and removed; None keeps
+    them forever.  Beyond maxsize entries, the least recently used are
+    removed.  With by_pattern, VINs are keyed on lookup_key(vin, True),
+    so a single entry serves every vehicle of a model, plant and year;
+    the cached result's VIN field is replaced with the VIN asked for.
+    Safe to share between threads.
+
+    len() and stats() report a running count of the entries, which
+    can lag behind what other processes sharing the database add.
+    """
+
+    def __init__(self, path=':memory:', ttl=30 * 24 * 60 * 60, maxsize=100000,
+                 by_pattern=False):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.by_pattern = by_pattern
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            # Readers in other processes don't block writers, and commits
+            # don't wait for the disk
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        with self._db:
+            self._recount()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def key(self, vin):
+        """
+        Returns the key vin's result is cached under.
+        """
+        return lookup_key(vin, self.by_pattern)
+
+    def get(self, vin):
+        """
+        Returns the cached result for vin, or None.
+        """
+        return self.get_many([vin])[0]
+
+    def get_many(self, vins):
+        """
+        Returns a list holding the cached result for each of vins, or
+        None for those that aren't cached.
+        """
+        vins = list(vins)
+        keys = [self.key(vin) for vin in vins]
+        now = time.time()
+        found = {}
+        with self._lock:
+            with self._db:
+                unique = list(set(keys))
+                for i in range(0, len(unique), _MAX_PARAMS):
+                    part = unique[i:i + _MAX_PARAMS]
+                    rows = self._db.execute(
+                        'SELECT key, result, stored FROM results WHERE key IN (%s)'
+                        % ','.join('?' * len(part)), part)
+                    for key, result, stored in rows:
+                        found[key] = (result, stored)
+                expired = [key for key, (_, stored) in found.items()
+                           if self.ttl is not None and stored < now - self.ttl]
+                for key in expired:
+                    del found[key]
+                if expired:
+                    # (executemany()'s rowcount is -1 for no rows on Python 2)
+                    self._size -= self._db.executemany(
+                        'DELETE FROM results WHERE key = ?',
+                        [(key,) for key in expired]).rowcount
+                self._db.executemany('UPDATE results SET used = ? WHERE key = ?',
+                                     [(now, key) for key in found])
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+
+        decoded = []
+        for vin, key in zip(vins, keys):
+            if key in found:
+                result = json.loads(found[key][0])
+                if 'VIN' in result:
+                    result['VIN'] = vin
+                decoded.append(result)
+            else:
+                decoded.append(None)
+        return decoded
+
+    def put(self, vin, result):
+        """
+        Caches result as vin's.
+        """
+        self.put_many([(vin, result)])
+
+    def put_many(self, items):
+        """
+        Caches each (vin, result) pair in items, skipping None results,
+        then evicts the least recently used entries beyond maxsize.
+        """
+        now = time.time()
+        rows = [(self.key(vin), json.dumps(result), now, now)
+                for vin, result in items if result is not None]
+        if not rows:
+            return
+        with self._lock:
+            with self._db:
+                # Only new keys are inserted, so rowcount says how many
+                # entries were added
+                added = self._db.executemany(
+                    'INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?)', rows).rowcount
+                if added < len(rows):
+                    self._db.executemany(
+                        'UPDATE results SET result = ?, stored = ?, used = ? WHERE key = ?',
+                        [(result, stored, used, key) for key, result, stored, used in rows])
+                self._size += added
+                self._added += added
+                if self._added >= self.maxsize // _RECOUNT:
+                    self._recount()
+                self._evict()
+
+    def _recount(self):
+        if self.ttl is not None:
+            self._db.execute('DELETE FROM results WHERE stored < ?',
+                             (time.time() - self.ttl,))
+        self._size = self._db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        self._added = 0
+
+    def _evict(self):
+        if self._size > self.maxsize:
+            evicted = self._db.execute(
+                'DELETE FROM results WHERE key IN '
+                '(SELECT key FROM results ORDER BY used LIMIT ?)',
+                (self._size - self.maxsize,)).rowcount
+            self._size -= evicted
+            self.evictions += evicted
+
+    def purge(self):
+        """
+        Removes expired entries.  Returns how many there were.
+        """
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            with self._db:
+                purged = self._db.execute('DELETE FROM results WHERE stored < ?',
+                                          (time.time() - self.ttl,)).rowcount
+                self._size -= purged
+                return purged
+
+    def clear(self):
+        """
+        Empties the cache and resets its counters.
+        """
+        with self._lock:
+            with self._db:
+                self._db.execute('DELETE FROM results')
+                self._recount()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns a CacheStats tuple of the counters and current size.
+        """
+        return CacheStats(self.hits, self.misses, self.evictions,
+                          len(self), self.maxsize)
@@ -0,0 +1,72 @@
+"""
+VINs packed into integers and bytes
+
+VINs use 33 characters (no I, O or Q), so one is a 17 digit base-33
+number, which needs 86 bits: pack_vin() returns that number, and
+pack_vin_bytes() the same as 11 bytes, big-endian.  Digits are numbered
+in the characters' ASCII order, so packed VINs sort exactly as the VINs
+do, by WMI first.  libvin.batch.pack_many() does the same for whole
+arrays of VINs.
+"""
+
+import binascii
+
+# VIN characters in the order of their digit values
+ALPHABET = '0123456789ABCDEFGHJKLMNPRSTUVWXYZ'
+
+# Length of pack_vin_bytes()'s result
+PACKED_BYTES = 11
+
+# Character, in either case, or its byte value -> digit value
+_DIGITS = {}
+for _digit, _char in enumerate(ALPHABET):
+    for _key in (_char, _char.lower()):
+        _DIGITS[_key] = _DIGITS[ord(_key)] = _digit
+
+_LIMIT = len(ALPHABET) ** 17
+
+
+def pack_vin(vin):
+    """
+    Returns vin, a string or bytes of 17 VIN characters in either case,
+    as an integer from 0 to 33 ** 17 - 1.  The check digit isn't checked.
+    Raises ValueError for anything else.
+    """
+    if len(vin) != 17:
+        raise ValueError("VIN must be 17 characters: %r" % (vin,))
+    packed = 0
+    try:
+        for char in vin:
+            packed = packed * 33 + _DIGITS[char]
+    except KeyError:
+        raise ValueError("not a VIN character: %r" % (char,))
+    return packed
+
+
+def unpack_vin(packed):
+    """
+    Returns the upper case VIN string pack_vin() packed into packed.
+    """
+    if not 0 <= packed < _LIMIT:
+        raise ValueError("not a packed VIN: %r" % (packed,))
+    chars = []
+    for _ in range(17):
+        packed, digit = divmod(packed, 33)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def pack_vin_bytes(vin):
+    """
+    Returns pack_vin(vin) as PACKED_BYTES bytes, big-endian.
+    """
+    return binascii.unhexlify('%022x' % pack_vin(vin))
+
+
+def unpack_vin_bytes(data):
+    """
+    Returns the VIN string pack_vin_bytes() packed into data.
+    """
+    if len(data) != PACKED_BYTES:
+        raise ValueError("packed VIN must be %d bytes: %r" % (PACKED_BYTES, data))
+    return unpack_vin(int(binascii.hexlify(data), 16))
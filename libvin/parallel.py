@@ -0,0 +1,61 @@
+"""
+Process pool helpers for decoding large inputs on several cores
+
+Worker processes find the lookup tables from libvin.static and
+libvin.tables already loaded: on platforms that fork they inherit them
+from the parent, elsewhere each worker imports them once.  Only VINs
+and decoded results travel between processes.
+"""
+
+import multiprocessing
+from collections import deque
+from contextlib import contextmanager
+
+
+def pool_size(workers, processes=None):
+    """
+    Returns the number of processes meant by workers: either that number,
+    or for a Pool, processes if given, else the number of CPUs (which is
+    what Pool() starts by default).
+    """
+    if isinstance(workers, int):
+        return workers
+    return processes or multiprocessing.cpu_count()
+
+
+@contextmanager
+def worker_pool(workers):
+    """
+    Yields a multiprocessing.Pool with the given number of processes,
+    shutting it down afterwards.  If workers is already a Pool, yields it
+    unchanged and leaves it running.
+    """
+    if not isinstance(workers, int):
+        yield workers
+        return
+    pool = multiprocessing.Pool(workers)
+    try:
+        yield pool
+    except Exception:
+        pool.terminate()
+        pool.join()
+        raise
+    # KeyboardInterrupt and SystemExit go straight through; the pool's
+    # workers are daemons, terminated when the interpreter exits
+    pool.close()
+    pool.join()
+
+
+def imap_ordered(pool, func, iterable, ahead):
+    """
+    Like pool.imap(func, iterable), but only takes items from iterable
+    as results are consumed, keeping at most ahead of them in flight, so
+    memory use doesn't depend on the length of iterable.
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.apply_async(func, (item,)))
+        if len(pending) >= ahead:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
@@ -0,0 +1,196 @@
+"""
+VIN masks compiled to per-position sets of allowed characters
+
+Recall notices and vPIC patterns describe groups of VINs with masks such
+as 1GKEV1*7*8J, where * (or ?) stands for any character and [...] for
+one of several: [A-C], [1357] or [^Z].  compile_mask() turns a mask into
+a VinPattern holding, for each of the 17 positions, a 33-bit set of the
+characters allowed there (bit n for the nth character of ALPHABET).  A
+mask shorter than 17 characters leaves the rest open.
+
+PatternSet matches one VIN against many patterns at once: for each
+position and character it keeps the set of patterns allowing that
+character there, as the bits of an integer, so matching is 17 lookups
+and ANDs however many patterns there are.  libvin.batch.match_many()
+matches a pattern against whole arrays of VINs.
+"""
+
+from libvin.packing import ALPHABET
+
+# Stand for any character in a mask
+ANY = '*?'
+
+# Bits for every character
+ALL = (1 << len(ALPHABET)) - 1
+
+# Character, in either case, or its byte value -> bit number
+_DIGITS = {}
+for _digit, _char in enumerate(ALPHABET):
+    for _key in (_char, _char.lower()):
+        _DIGITS[_key] = _DIGITS[ord(_key)] = _digit
+
+
+def _parse_class(body, mask):
+    """
+    Returns the bits for the characters listed between [ and ].
+    """
+    negate = body.startswith('^')
+    if negate:
+        body = body[1:]
+    bits = 0
+    i = 0
+    while i < len(body):
+        if i + 2 < len(body) and body[i + 1] == '-':
+            first, last = _DIGITS.get(body[i]), _DIGITS.get(body[i + 2])
+            if first is None or last is None or first > last:
+                raise ValueError("bad range %r in mask %r" % (body[i:i + 3], mask))
+            for digit in range(first, last + 1):
+                bits |= 1 << digit
+            i += 3
+        else:
+            digit = _DIGITS.get(body[i])
+            if digit is None:
+                raise ValueError("not a VIN character: %r in mask %r" % (body[i], mask))
+            bits |= 1 << digit
+            i += 1
+    if not body:
+        raise ValueError("empty [] in mask %r" % mask)
+    return ALL & ~bits if negate else bits
+
+
+def _parse(mask):
+    """
+    Returns the bits allowed at each of the 17 positions by mask.
+    """
+    positions = []
+    i = 0
+    while i < len(mask):
+        char = mask[i]
+        if char in ANY:
+            positions.append(ALL)
+            i += 1
+        elif char == '[':
+            end = mask.find(']', i + 1)
+            if end < 0:
+                raise ValueError("unclosed [ in mask %r" % mask)
+            positions.append(_parse_class(mask[i + 1:end], mask))
+            i = end + 1
+        else:
+            digit = _DIGITS.get(char)
+            if digit is None:
+                raise ValueError("not a VIN character: %r in mask %r" % (char, mask))
+            positions.append(1 << digit)
+            i += 1
+    if len(positions) > 17:
+        raise ValueError("mask covers more than 17 characters: %r" % mask)
+    return tuple(positions + [ALL] * (17 - len(positions)))
+
+
+class VinPattern(object):
+    """
+    A compiled mask: bits[p] is the set of characters allowed at
+    position p, from 0, and checks lists (p, bits[p]) for just the
+    positions that rule something out.
+    """
+
+    def __init__(self, mask):
+        self.mask = mask
+        self.bits = _parse(mask)
+        self.checks = tuple((position, bits) for position, bits in enumerate(self.bits)
+                            if bits != ALL)
+        # The same as sets of the characters, and byte values, allowed;
+        # made by the first match()
+        self._allowed = None
+
+    def __repr__(self):
+        return 'VinPattern(%r)' % self.mask
+
+    def prefix(self):
+        """
+        Returns the characters every matching VIN starts with.
+        """
+        chars = []
+        for bits in self.bits:
+            if bits & (bits - 1):
+                break
+            chars.append(ALPHABET[bits.bit_length() - 1])
+        return ''.join(chars)
+
+    def match(self, vin):
+        """
+        Returns True if vin, a string or bytes of 17 VIN characters in
+        either case, matches the pattern.
+        """
+        if len(vin) != 17:
+            return False
+        if self._allowed is None:
+            self._allowed = tuple(
+                (position, frozenset(key for key, digit in _DIGITS.items()
+                                     if bits >> digit & 1))
+                for position, bits in self.checks)
+        for position, allowed in self._allowed:
+            if vin[position] not in allowed:
+                return False
+        return True
+
+
+def compile_mask(mask):
+    """
+    Returns a VinPattern for mask.  Raises ValueError if it isn't valid.
+    """
+    return VinPattern(mask)
+
+
+class PatternSet(object):
+    """
+    Matches VINs against many patterns at once.  patterns are masks or
+    VinPatterns; match() returns the indexes of those a VIN matches.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [p if isinstance(p, VinPattern) else VinPattern(p)
+                         for p in patterns]
+        everything = (1 << len(self.patterns)) - 1
+        # (position, [digit -> bits of the patterns allowing it there],
+        # bits of the patterns allowing anything there), leaving out
+        # positions no pattern checks
+        self._tables = []
+        for position in range(17):
+            # Characters allowed -> bits of the patterns allowing them,
+            # as most patterns allow one character or all of them
+            groups = {}
+            for number, pattern in enumerate(self.patterns):
+                bits = pattern.bits[position]
+                groups[bits] = groups.get(bits, 0) | 1 << number
+            table = [0] * len(ALPHABET)
+            for bits, numbers in groups.items():
+                for digit in range(len(ALPHABET)):
+                    if bits >> digit & 1:
+                        table[digit] |= numbers
+            if any(allowed != everything for allowed in table):
+                self._tables.append((position, table, groups.get(ALL, 0)))
+        self._everything = everything
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def match(self, vin):
+        """
+        Returns the indexes, in order, of the patterns vin matches.
+        """
+        if len(vin) != 17:
+            return []
+        found = self._everything
+        for position, table, unchecked in self._tables:
+            digit = _DIGITS.get(vin[position])
+            # Characters that aren't VIN characters only pass patterns
+            # that don't check the position
+            found &= unchecked if digit is None else table[digit]
+            if not found:
+                return []
+        numbers = []
+        while found:
+            lowest = found & -found
+            numbers.append(lowest.bit_length() - 1)
+            found ^= lowest
+        return numbers
@@ -0,0 +1,209 @@
+"""
+Offline vPIC lookups from a local snapshot
+
+A snapshot is an SQLite file mapping each squish VIN (see Vin.squish)
+to the fields vPIC returned for a VIN with that pattern.  Build one with
+the libvin-snapshot command from vPIC results saved as CSV (for example
+the output of the DecodeVINValuesBatch API with format=csv) or as JSON
+lines, then answer lookups with VpicSnapshot, which never touches the
+network:
+
+    libvin-snapshot vpic-results.csv vpic.sqlite
+"""
+
+import argparse
+import csv
+import errno
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+
+from libvin.nhtsa_cache import lookup_key
+
+try:
+    from urllib.request import pathname2url
+except ImportError:
+    from urllib import pathname2url
+
+_SCHEMA = '''
+CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE patterns (key TEXT PRIMARY KEY, result TEXT NOT NULL) WITHOUT ROWID;
+'''
+
+
+def _vin_field(names):
+    for name in names:
+        if name.lower() == 'vin':
+            return name
+    raise ValueError("no VIN field in %s" % ', '.join(names))
+
+
+def read_results_csv(infile):
+    """
+    Yields the vPIC results in a CSV file with a header row naming the
+    fields, as dictionaries.
+    """
+    return csv.DictReader(infile)
+
+
+def read_results_jsonl(infile):
+    """
+    Yields the vPIC results in a file with one JSON object per line.
+    """
+    for line in infile:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _write_snapshot(results, db):
+    """
+    Stores results in db, a new SQLite database, and returns the number
+    of patterns stored.
+    """
+    db.executescript(_SCHEMA)
+    fields = []
+    known = set()
+    with db:
+        for result in results:
+            vin_field = _vin_field(list(result))
+            for name in result:
+                if name not in known:
+                    known.add(name)
+                    fields.append(name)
+            # Empty fields, which are most of them, are left out and
+            # restored on lookup
+            stored = dict((name, value) for name, value in result.items()
+                          if value not in ('', None) and name != vin_field)
+            db.execute('INSERT OR IGNORE INTO patterns VALUES (?, ?)',
+                       (lookup_key(result[vin_field], by_pattern=True),
+                        json.dumps(stored, sort_keys=True)))
+        if not fields:
+            raise ValueError("no vPIC results to build a snapshot from")
+        db.execute('INSERT INTO meta VALUES (?, ?)', ('fields', json.dumps(fields)))
+    count = db.execute('SELECT COUNT(*) FROM patterns').fetchone()[0]
+    db.execute('VACUUM')
+    return count
+
+
+def build_snapshot(results, path):
+    """
+    Writes a snapshot holding the given vPIC result dictionaries to an
+    SQLite file at path, replacing any file already there.  Each result
+    needs a VIN field (in any case); where several have the same squish
+    VIN, the first is kept.  Returns the number of patterns stored.
+    Raises ValueError if there are no results, or one has no VIN field,
+    and leaves path as it was.
+    """
+    # Built next to path and renamed into place, so that a failed build
+    # leaves nothing behind and readers never see half a snapshot
+    # (in a directory of its own, so it gets the usual permissions)
+    directory, name = os.path.split(os.path.abspath(path))
+    temp = tempfile.mkdtemp(prefix='.%s.' % name, dir=directory)
+    try:
+        db = sqlite3.connect(os.path.join(temp, name))
+        try:
+            count = _write_snapshot(results, db)
+        finally:
+            db.close()
+        os.rename(os.path.join(temp, name), path)
+    finally:
+        shutil.rmtree(temp)
+    return count
+
+
+class VpicSnapshot(object):
+    """
+    Decodes VINs from a snapshot built by build_snapshot(), returning
+    dictionaries shaped like NhtsaClient's, or None for VINs whose
+    pattern isn't in the snapshot.  Safe to share between threads.
+    The file is opened read-only; raises IOError if there is none at
+    path, and ValueError if it isn't a snapshot.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # sqlite3 would create a missing file; snapshots are only read
+        if not os.path.isfile(path):
+            raise IOError(errno.ENOENT, "No vPIC snapshot", path)
+        if sys.version_info >= (3, 4):
+            uri = 'file:%s?mode=ro' % pathname2url(os.path.abspath(path))
+            self._db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+        try:
+            fields = json.loads(self._db.execute(
+                "SELECT value FROM meta WHERE name = 'fields'").fetchone()[0])
+        except (sqlite3.DatabaseError, TypeError):
+            self._db.close()
+            raise ValueError("%s is not a vPIC snapshot" % path)
+        self._vin_field = _vin_field(fields)
+        self._empty = dict((name, '') for name in fields)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM patterns').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def decode(self, vin):
+        '''
+        Return the snapshot's vPIC interpretation of the VIN in a dictionary,
+        or None if it doesn't know the VIN's pattern.
+        '''
+        key = lookup_key(vin, by_pattern=True)
+        with self._lock:
+            row = self._db.execute('SELECT result FROM patterns WHERE key = ?',
+                                   (key,)).fetchone()
+        if row is None:
+            return None
+        result = dict(self._empty)
+        result.update(json.loads(row[0]))
+        result[self._vin_field] = vin
+        return result
+
+    def decode_batch(self, vins):
+        '''
+        Return a list holding the snapshot's interpretation of each VIN,
+        in the same order, or None for VINs it doesn't know.
+        '''
+        return [self.decode(vin) for vin in vins]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='libvin-snapshot',
+        description="Build an offline vPIC snapshot for libvin.snapshot.VpicSnapshot.")
+    parser.add_argument('input', help="file of vPIC results, with a VIN field")
+    parser.add_argument('output', help="snapshot file to create")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'],
+                        help="default depends on the input file's extension")
+    args = parser.parse_args(argv)
+    if args.input_format is None:
+        args.input_format = 'csv' if args.input.lower().endswith('.csv') else 'jsonl'
+
+    read = read_results_csv if args.input_format == 'csv' else read_results_jsonl
+    try:
+        with open(args.input, 'r') as infile:
+            count = build_snapshot(read(infile), args.output)
+    except (ValueError, sqlite3.Error) as e:
+        sys.stderr.write("libvin-snapshot: %s\n" % e)
+        return 1
+    sys.stderr.write("libvin-snapshot: stored %d patterns\n" % count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
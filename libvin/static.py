@@ -1,3 +1,6 @@
+from libvin.codes import (BRAND_CODES, VIN_TRANSLATION, VIN_WEIGHT, YEARS_CODES_PRE_2010,
+    YEARS_CODES_PRE_2040)
+
 WORLD_MANUFACTURER_REGIONS = {
     'africa': 'ABCDEFGH',
     'asia': 'JKLMNPR',
@@ -166,32 +169,6 @@ WORLD_MANUFACTURER_MAP = {
 
 }
 
-YEARS_CODES_PRE_2010 = {
-    'A': 1980, 'L': 1990, 'Y': 2000,
-    'B': 1981, 'M': 1991, '1': 2001,
-    'C': 1982, 'N': 1992, '2': 2002,
-    'D': 1983, 'P': 1993, '3': 2003,
-    'E': 1984, 'R': 1994, '4': 2004,
-    'F': 1985, 'S': 1995, '5': 2005,
-    'G': 1986, 'T': 1996, '6': 2006,
-    'H': 1987, 'V': 1997, '7': 2007,
-    'J': 1988, 'W': 1998, '8': 2008,
-    'K': 1989, 'X': 1999, '9': 2009,
-}
-
-YEARS_CODES_PRE_2040 = {
-    'A': 2010,    'L': 2020, 'Y': 2030,
-    'B': 2011,    'M': 2021, '1': 2031,
-    'C': 2012,    'N': 2022, '2': 2032,
-    'D': 2013,    'P': 2023, '3': 2033,
-    'E': 2014,    'R': 2024, '4': 2034,
-    'F': 2015,    'S': 2025, '5': 2035,
-    'G': 2016,    'T': 2026, '6': 2036,
-    'H': 2017,    'V': 2027, '7': 2037,
-    'J': 2018,    'W': 2028, '8': 2038,
-    'K': 2019,    'X': 2029, '9': 2039,
-}
-
 # Possible sources for missing entries:
 # https://en.wikibooks.org/wiki/Vehicle_Identification_Numbers_(VIN_codes)
 # https://en.wikibooks.org/wiki/Vehicle_Identification_Numbers_(VIN_codes)/World_Manufacturer_Identifier_(WMI)
@@ -502,18 +479,23 @@ WMI_MAP = {
     '9FB': 'Renault Colombia',
     }
 
-VIN_TRANSLATION = {
-    'A': 1, 'L': 3, 'Y': 8,
-    'B': 2, 'M': 4, 'Z': 9,
-    'C': 3, 'N': 5, '1': 1,
-    'D': 4, 'P': 7, '2': 2,
-    'E': 5, 'R': 9, '3': 3,
-    'F': 6, 'S': 2, '4': 4,
-    'G': 7, 'T': 3, '5': 5,
-    'H': 8, 'V': 5, '6': 6,
-    'J': 1, 'W': 6, '7': 7,
-    'K': 2, 'X': 7, '8': 8,
-    '9': 9, '0': 0, 'U': 4,
+# Suffixes stripped from WMI_MAP entries to get the make, applied in order.
+# Makes should be same as values from e.g.
+# http://www.fueleconomy.gov/ws/rest/vehicle/menu/make?year=2012
+MAKE_SUFFIXES = [
+    'Canada',
+    'Cars',
+    'France',
+    'Hungary',
+    'Mexico',
+    'Motor Company',
+    'Truck USA',
+    'Turkey',
+    'USA',
+    'USA - trucks',
+]
+
+# Makes after stripping suffixes that don't match the brand name
+MAKE_RENAMES = {
+    'General Motors': 'GMC',
 }
-
-VIN_WEIGHT = [8,7,6,5,4,3,2,10,0,9,8,7,6,5,4,3,2]
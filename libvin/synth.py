@@ -0,0 +1,219 @@
+"""
+Synthetic VINs for load testing
+
+Generates VINs with correct check digits from the manufacturers in
+WMI_MAP and the model year codes, a whole array at a time, optionally
+with a fraction deliberately made invalid.  Each invalid VIN has one
+defect, labelled with the libvin.batch.REASON_* code validate_many()
+reports for it.  The same arguments and seed always give the same VINs.
+
+To write a million VINs, five percent of them invalid, with labels:
+
+    python -m libvin.synth 1000000 --invalid 0.05 --labels -o vins.csv
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from libvin.batch import (REASON_CHECK_DIGIT, REASON_ILLEGAL_CHAR, REASON_LENGTH,
+    REASON_NAMES, REASON_YEAR_CODE)
+from libvin.static import (VIN_TRANSLATION, VIN_WEIGHT, WMI_MAP, YEARS_CODES_PRE_2010,
+    YEARS_CODES_PRE_2040)
+
+# Defects generate() can introduce, as REASON_* codes
+DEFECTS = (REASON_LENGTH, REASON_ILLEGAL_CHAR, REASON_YEAR_CODE, REASON_CHECK_DIGIT)
+
+# Model years generated by default
+DEFAULT_YEARS = range(1981, 2026)
+
+_ALPHABET = np.frombuffer(b'0123456789ABCDEFGHJKLMNPRSTUVWXYZ', dtype=np.uint8)
+_DIGITS = _ALPHABET[:10]
+_LETTERS = _ALPHABET[10:]
+_CHECK_CHARS = np.frombuffer(b'0123456789X', dtype=np.uint8)
+_BAD_YEARS = np.frombuffer(b'UZ0', dtype=np.uint8)
+_ILLEGAL_CHARS = np.frombuffer(b'IOQ', dtype=np.uint8)
+
+# Byte -> transliterated value, 0 for anything else
+_VALUES = np.zeros(256, dtype=np.int32)
+for _char, _value in VIN_TRANSLATION.items():
+    _VALUES[ord(_char)] = _value
+_WEIGHTS = np.array(VIN_WEIGHT, dtype=np.int32)
+
+# Model year - 1980 -> year code
+_YEAR_CODES = np.zeros(60, dtype=np.uint8)
+for _codes in (YEARS_CODES_PRE_2010, YEARS_CODES_PRE_2040):
+    for _char, _year in _codes.items():
+        _YEAR_CODES[_year - 1980] = ord(_char)
+
+
+def _legal(wmi):
+    return len(wmi) == 3 and all(c.encode('ascii') in _ALPHABET.tobytes() for c in wmi)
+
+
+def _default_wmis():
+    """
+    Returns {wmi: weight} giving each entry in WMI_MAP the same weight,
+    split evenly over every third character for two character entries.
+    """
+    weights = {}
+    for key in WMI_MAP:
+        if len(key) == 2:
+            for third in _ALPHABET.tobytes().decode('ascii'):
+                if _legal(key + third):
+                    weights[key + third] = weights.get(key + third, 0) + 1.0 / len(_ALPHABET)
+        elif _legal(key):
+            weights[key] = weights.get(key, 0) + 1.0
+    return weights
+
+
+def _distribution(choices, check, name):
+    """
+    Returns (values, probabilities) for a dict of weights or a sequence
+    of equally likely values.
+    """
+    if isinstance(choices, dict):
+        values = sorted(choices)
+        weights = np.array([choices[value] for value in values], dtype=float)
+    else:
+        values = sorted(set(choices))
+        weights = np.ones(len(values))
+    if not values or weights.sum() <= 0:
+        raise ValueError("no %s to choose from" % name)
+    for value in values:
+        if not check(value):
+            raise ValueError("invalid %s: %r" % (name, value))
+    return values, weights / weights.sum()
+
+
+class _Generator(object):
+
+    def __init__(self, seed, wmis, years, invalid, defects):
+        if not 0 <= invalid <= 1:
+            raise ValueError("invalid must be between 0 and 1")
+        for defect in defects:
+            if defect not in DEFECTS:
+                raise ValueError("unknown defect: %r" % defect)
+        if invalid and not defects:
+            raise ValueError("no defects to choose from")
+        wmis, self.wmi_p = _distribution(_default_wmis() if wmis is None else wmis,
+                                         _legal, 'WMI')
+        self.wmis = np.array([list(bytearray(wmi.encode('ascii'))) for wmi in wmis],
+                             dtype=np.uint8)
+        years, self.year_p = _distribution(DEFAULT_YEARS if years is None else years,
+                                           lambda year: 1980 <= year < 2040, 'year')
+        self.years = np.array(years)
+        self.invalid = invalid
+        self.defects = np.array(defects, dtype=np.uint8)
+        self.rng = np.random.RandomState(seed)
+
+    def _check_digits(self, chars):
+        return _CHECK_CHARS[_VALUES.take(chars).dot(_WEIGHTS) % 11]
+
+    def generate(self, count):
+        rng = self.rng
+        chars = np.empty((count, 17), dtype=np.uint8)
+        chars[:, :3] = self.wmis[rng.choice(len(self.wmis), count, p=self.wmi_p)]
+        chars[:, 3:8] = _ALPHABET[rng.randint(0, len(_ALPHABET), (count, 5))]
+        years = self.years[rng.choice(len(self.years), count, p=self.year_p)]
+        # A letter in position 7 means the year code is from 2010 or later
+        chars[:, 6] = np.where(years >= 2010,
+                               _LETTERS[rng.randint(0, len(_LETTERS), count)],
+                               _DIGITS[rng.randint(0, 10, count)])
+        chars[:, 9] = _YEAR_CODES[years - 1980]
+        chars[:, 10:12] = _ALPHABET[rng.randint(0, len(_ALPHABET), (count, 2))]
+        chars[:, 12:] = _DIGITS[rng.randint(0, 10, (count, 5))]
+
+        labels = np.zeros(count, dtype=np.uint8)
+        if self.invalid:
+            bad = np.flatnonzero(rng.random_sample(count) < self.invalid)
+            labels[bad] = self.defects[rng.randint(0, len(self.defects), len(bad))]
+            rows = labels == REASON_YEAR_CODE
+            chars[rows, 9] = _BAD_YEARS[rng.randint(0, 3, rows.sum())]
+        chars[:, 8] = self._check_digits(chars)
+
+        if self.invalid:
+            rows = np.flatnonzero(labels == REASON_CHECK_DIGIT)
+            right = _VALUES.take(chars[rows]).dot(_WEIGHTS) % 11
+            chars[rows, 8] = _CHECK_CHARS[(right + rng.randint(1, 11, len(rows))) % 11]
+            rows = np.flatnonzero(labels == REASON_ILLEGAL_CHAR)
+            chars[rows, rng.randint(0, 17, len(rows))] = \
+                _ILLEGAL_CHARS[rng.randint(0, 3, len(rows))]
+            # Drop the last character
+            chars[labels == REASON_LENGTH, 16] = 0
+        return chars.view('S17').reshape(-1), labels
+
+
+def generate(count, seed=None, wmis=None, years=None, invalid=0.0, defects=DEFECTS):
+    """
+    Returns (vins, labels): count VINs as an array of 17 byte strings,
+    and the REASON_* code of each, REASON_OK for valid VINs.
+
+    wmis and years give the distribution of manufacturers and model
+    years: either a dict mapping each WMI or year to its weight, or a
+    sequence of equally likely ones.  By default every WMI_MAP entry and
+    every year in DEFAULT_YEARS is equally likely.  A fraction invalid
+    of the VINs get one of the given defects: too short, an I, O or Q
+    somewhere, a U, Z or 0 for the year, or a wrong check digit.
+    """
+    return _Generator(seed, wmis, years, invalid, defects).generate(count)
+
+
+def generate_chunks(count, chunk_size=100000, seed=None, wmis=None, years=None,
+                    invalid=0.0, defects=DEFECTS):
+    """
+    Yields (vins, labels) as for generate(), chunk_size VINs at a time,
+    until count have been generated.
+    """
+    generator = _Generator(seed, wmis, years, invalid, defects)
+    for start in range(0, count, chunk_size):
+        yield generator.generate(min(chunk_size, count - start))
+
+
+def write_vins(outfile, count, labels=False, chunk_size=100000, **kwargs):
+    """
+    Writes count generated VINs to a binary file, one per line, a chunk
+    at a time.  With labels, each line also has a comma and the name of
+    the VIN's defect, or 'ok'.  Other arguments are as for generate().
+    """
+    names = np.array([REASON_NAMES[code].encode('ascii') for code in range(len(REASON_NAMES))])
+    for vins, codes in generate_chunks(count, chunk_size, **kwargs):
+        if labels:
+            lines = np.char.add(np.char.add(vins, b','), names[codes])
+        else:
+            lines = vins
+        outfile.write(b'\n'.join(lines.tolist()) + b'\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m libvin.synth',
+                                     description="Generate synthetic VINs.")
+    parser.add_argument('count', type=int, help="number of VINs to generate")
+    parser.add_argument('-o', '--output', default='-',
+                        help="file to write the VINs to; default is stdout")
+    parser.add_argument('--seed', type=int, help="random seed, for repeatable output")
+    parser.add_argument('--invalid', type=float, default=0.0,
+                        help="fraction of VINs to make invalid (default %(default)s)")
+    parser.add_argument('--labels', action='store_true',
+                        help="add a comma and the defect ('ok' if none) to each line")
+    args = parser.parse_args(argv)
+
+    if args.output == '-':
+        outfile = getattr(sys.stdout, 'buffer', sys.stdout)
+    else:
+        outfile = open(args.output, 'wb')
+    try:
+        write_vins(outfile, args.count, labels=args.labels, seed=args.seed,
+                   invalid=args.invalid)
+    except ValueError as e:
+        sys.stderr.write("libvin.synth: %s\n" % e)
+        return 1
+    finally:
+        if outfile is not getattr(sys.stdout, 'buffer', sys.stdout):
+            outfile.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
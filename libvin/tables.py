@@ -0,0 +1,131 @@
+"""
+Lookup tables compiled from libvin.static at import time
+
+The tables in libvin.static are laid out for people to read and edit.
+The ones here hold the same information keyed the way Vin looks it up,
+so each lookup is a single dict access.
+
+If the LIBVIN_TABLES environment variable names a file written by
+libvin.mapped, the tables are read from it instead, and libvin.static
+is only imported to check the file is up to date.  A file that can't be
+used, such as a missing one or one built from an older libvin.static,
+is ignored with a warning.
+"""
+
+import os
+import warnings
+
+from libvin.codes import BRAND_CODES
+
+# Every character that can appear in the first two positions of a WMI
+# in WORLD_MANUFACTURER_MAP.
+WMI_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890'
+
+
+def compile_regions():
+    """
+    Returns a dict mapping the first character of a VIN to the region,
+    for every first character in WORLD_MANUFACTURER_MAP.
+    """
+    from libvin.static import WORLD_MANUFACTURER_MAP
+    return dict((first, info['region'])
+                for first, info in WORLD_MANUFACTURER_MAP.items())
+
+
+def compile_countries():
+    """
+    Returns a dict mapping the first two characters of a VIN to the
+    country, for every first character in WORLD_MANUFACTURER_MAP.
+    """
+    from libvin.static import WORLD_MANUFACTURER_MAP
+    table = {}
+    for first, info in WORLD_MANUFACTURER_MAP.items():
+        countries = info['countries']
+        for second in WMI_CHARS:
+            table[first + second] = 'Unknown'
+            # Same search order as the range strings were scanned in before
+            for codes in countries:
+                if second in codes:
+                    table[first + second] = countries[codes]
+                    break
+    return table
+
+
+def _normalize_make(manufacturer):
+    """
+    Returns the make for a WMI_MAP entry: the manufacturer without
+    country or other suffixes, as a short common name.
+    """
+    from libvin.static import MAKE_RENAMES, MAKE_SUFFIXES
+    make = manufacturer
+    for suffix in MAKE_SUFFIXES:
+        if make.endswith(suffix):
+            make = make.replace(" %s" % suffix, "")
+    return MAKE_RENAMES.get(make, make)
+
+
+def _wmi_entry(manufacturer):
+    make = _normalize_make(manufacturer)
+    return (manufacturer, make, BRAND_CODES.get(make))
+
+
+def compile_wmis():
+    """
+    Returns a dict mapping every three character WMI covered by WMI_MAP,
+    and every two character WMI_MAP key, to its WMIS entry.  Three
+    character keys of WMI_MAP take precedence over two character ones.
+    """
+    from libvin.static import WMI_MAP
+    table = {}
+    for wmi, manufacturer in WMI_MAP.items():
+        if len(wmi) == 2:
+            entry = _wmi_entry(manufacturer)
+            table[wmi] = entry
+            for third in WMI_CHARS:
+                table[wmi + third] = entry
+    for wmi, manufacturer in WMI_MAP.items():
+        if len(wmi) != 2:
+            table[wmi] = _wmi_entry(manufacturer)
+    return table
+
+
+# Entry for WMIs not in WMI_MAP
+UNKNOWN_WMI = ('Unknown', 'Unknown', BRAND_CODES.get('Unknown'))
+
+
+def _load_mapped(path):
+    """
+    Returns the MappedWmiTable at path, or None, with a warning, if it
+    can't be used.
+    """
+    from libvin.mapped import MappedWmiTable
+    try:
+        return MappedWmiTable(path)
+    except (ValueError, EnvironmentError) as e:
+        warnings.warn("%s; building the tables from libvin.static instead" % e)
+        return None
+
+
+_mapped = None
+if os.environ.get('LIBVIN_TABLES'):
+    _mapped = _load_mapped(os.environ['LIBVIN_TABLES'])
+if _mapped is not None:
+    REGIONS, COUNTRIES, WMIS = _mapped.regions, _mapped.countries, _mapped
+else:
+    # First character of the VIN -> region
+    REGIONS = compile_regions()
+    # First two characters of the VIN -> country
+    COUNTRIES = compile_countries()
+    # WMI -> (manufacturer, make, BRAND_CODES rule for the make or None)
+    WMIS = compile_wmis()
+
+
+def lookup_wmi(wmi):
+    """
+    Returns the WMIS entry for the first three characters of a VIN.
+    """
+    entry = WMIS.get(wmi)
+    if entry is None:
+        # Only reached for unknown WMIs and odd third characters
+        entry = WMIS.get(wmi[:2], UNKNOWN_WMI)
+    return entry
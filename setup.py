@@ -22,4 +22,13 @@ setup(name='libvin',
     test_suite="nose.collector",
     tests_require=REQUIRES,
     install_requires=REQUIRES,
+    extras_require={
+        'batch': ['numpy'],
+    },
+    entry_points={
+        'console_scripts': [
+            'libvin = libvin.cli:main',
+            'libvin-snapshot = libvin.snapshot:main',
+        ],
+    },
 )
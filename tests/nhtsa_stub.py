@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the parts of the vPIC API libvin uses
+"""
+import json
+import threading
+import time
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+
+from libvin.decoding import Vin
+
+
+def stub_result(vin):
+    v = Vin(vin)
+    # Trailing space, as vPIC sometimes sends
+    return {'VIN': vin, 'Make': v.make.upper() + ' ', 'ModelYear': str(v.year),
+            'ErrorCode': '0'}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def reply(self, results):
+        body = json.dumps({'Count': len(results), 'Results': results}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self.server.record(self.path):
+            self.send_error(503)
+            return
+        time.sleep(self.server.delay)
+        path = urlparse(self.path).path
+        prefix = '/api/vehicles/decodevinvalues/'
+        if not path.startswith(prefix):
+            self.send_error(404)
+            return
+        self.reply([stub_result(path[len(prefix):])])
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        if not self.server.record(self.path):
+            self.send_error(503)
+            return
+        time.sleep(self.server.delay)
+        if urlparse(self.path).path != '/api/vehicles/DecodeVINValuesBatch/':
+            self.send_error(404)
+            return
+        vins = form['data'][0].split(';')
+        self.reply([stub_result(vin) for vin in vins])
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    """
+    Serves StubHandler on a free local port, in a background thread,
+    taking delay seconds to answer each request.  The first failures
+    requests are answered with 503 Service Unavailable.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, delay=0, failures=0):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.delay = delay
+        self.failures = failures
+        self.paths = []
+        self._lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d/api/vehicles/' % self.server_address[1]
+
+    def record(self, path):
+        """
+        Records a request for path, and returns whether to answer it.
+        """
+        with self._lock:
+            self.paths.append(path)
+            return len(self.paths) > self.failures
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
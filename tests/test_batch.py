@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+
+from nose.tools import assert_equals, assert_true, raises
+import numpy as np
+
+from libvin.batch import (validate_many, decode_many, char_array, DECODE_FIELDS,
+    REASON_OK, REASON_LENGTH, REASON_ILLEGAL_CHAR, REASON_YEAR_CODE,
+    REASON_CHECK_DIGIT, match_many, pack_many, unpack_many)
+from libvin.decoding import Vin
+from libvin.packing import pack_vin
+from libvin.parallel import pool_size
+from libvin.patterns import compile_mask
+
+from . import TEST_DATA
+
+# Each entry is (vin, expected reason); derived from TEST_DATA VINs
+BAD_VINS = [
+    ('1GKEV13728J12373', REASON_LENGTH),
+    ('1GKEV13728J1237355', REASON_LENGTH),
+    ('', REASON_LENGTH),
+    ('1GKEV137I8J123735', REASON_ILLEGAL_CHAR),
+    ('1GKEV1372-J123735', REASON_ILLEGAL_CHAR),
+    ('1GKEV13720J123735', REASON_YEAR_CODE),
+    ('1GKEV13738J123735', REASON_CHECK_DIGIT),
+]
+
+class TestValidateMany(object):
+
+    def test_valid(self):
+        vins = [test['VIN'] for test in TEST_DATA]
+        valid, reasons = validate_many(vins)
+        assert_true(valid.all())
+        assert_true((reasons == REASON_OK).all())
+
+    def test_lowercase(self):
+        valid, reasons = validate_many([test['VIN'].lower() for test in TEST_DATA])
+        assert_true(valid.all())
+
+    def test_reasons(self):
+        valid, reasons = validate_many([vin for vin, reason in BAD_VINS])
+        for (vin, reason), ok, got in zip(BAD_VINS, valid, reasons):
+            print "Testing: %s" % vin
+            assert_true(not ok)
+            assert_equals(got, reason)
+
+    def test_matches_vin(self):
+        # Every single-character change of a good VIN gives the same verdict
+        vins = []
+        for test in TEST_DATA[:5]:
+            for i in range(17):
+                for c in '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ':
+                    vins.append(test['VIN'][:i] + c + test['VIN'][i+1:])
+        valid, reasons = validate_many(vins)
+        for vin, ok in zip(vins, valid):
+            assert_equals(ok, Vin(vin).is_valid)
+
+    def test_char_array(self):
+        chars, length_ok = char_array([test['VIN'] for test in TEST_DATA])
+        valid, reasons = validate_many(chars)
+        assert_true(length_ok.all())
+        assert_true(valid.all())
+
+
+class TestDecodeMany(object):
+
+    def test_fields(self):
+        vins = [test['VIN'] for test in TEST_DATA]
+        # Repeat the input so each WMI shows up more than once
+        decoded = decode_many(vins * 2)
+        assert_equals(sorted(decoded), sorted(DECODE_FIELDS))
+        for i, vin in enumerate(vins * 2):
+            v = Vin(vin)
+            print "Testing: %s" % vin
+            for field in DECODE_FIELDS:
+                assert_equals(decoded[field][i], getattr(v, field))
+
+    def test_iterable(self):
+        decoded = decode_many(test['VIN'].lower() for test in TEST_DATA)
+        assert_equals(list(decoded['make']), [test['MAKE'] for test in TEST_DATA])
+
+    def test_malformed(self):
+        # Positions can't be read: wrong length or illegal characters
+        vins = ['IGKEV13720J123735', '1GKEV13728J12373', '', '1GKEV13728J1237355']
+        decoded = decode_many(vins)
+        for field in ('region', 'country', 'manufacturer', 'make'):
+            assert_equals(list(decoded[field]), ['Unknown'] * 4)
+        for field in ('year', 'is_pre_2010', 'less_than_500_built_per_year', 'is_valid'):
+            assert_equals(list(decoded[field]), [0] * 4)
+        assert_equals(list(decoded['wmi']), ['IGK', '1GK', '', '1GK'])
+        # The whole VIN, as read
+        assert_equals(list(decoded['vin']), vins)
+
+    def test_check_digit(self):
+        # Only the check digit is wrong, as for many VINs from outside
+        # North America: decoded as Vin decodes it
+        vins = ['WBA3A5C50CF256652', '1GKEV13758J123735']
+        decoded = decode_many(vins)
+        for i, vin in enumerate(vins):
+            v = Vin(vin)
+            for field in DECODE_FIELDS:
+                assert_equals(decoded[field][i], getattr(v, field))
+        assert_equals((decoded['make'][0], decoded['year'][0]), ('BMW', 2012))
+
+    def test_workers(self):
+        vins = [test['VIN'] for test in TEST_DATA] * 3
+        single = decode_many(vins)
+        parallel = decode_many(vins, workers=2)
+        for field in DECODE_FIELDS:
+            assert_equals(list(parallel[field]), list(single[field]))
+        # An existing pool is split among its own processes
+        pool = multiprocessing.Pool(3)
+        try:
+            assert_equals(pool_size(pool, 3), 3)
+            assert_equals(pool_size(pool), multiprocessing.cpu_count())
+            parallel = decode_many(vins, workers=pool, processes=3)
+        finally:
+            pool.terminate()
+            pool.join()
+        assert_equals(list(parallel['make']), list(single['make']))
+
+
+class TestPackMany(object):
+
+    def test_round_trip(self):
+        vins = [test['VIN'] for test in TEST_DATA]
+        packed = pack_many([vin.lower() for vin in vins])
+        assert_equals(packed.itemsize, 12)
+        assert_equals([vin.decode('ascii') for vin in unpack_many(packed)], vins)
+        assert_equals([int(high) * 33 ** 5 + int(low) for high, low in packed.tolist()],
+                      [pack_vin(vin) for vin in vins])
+        assert_equals(list(unpack_many(pack_many(char_array(vins)[0]))),
+                      list(unpack_many(packed)))
+
+    def test_sort_order(self):
+        vins = [test['VIN'] for test in TEST_DATA] + ['00000000000000000',
+                                                      'ZZZZZZZZZZZZZZZZZ']
+        packed = pack_many(vins)
+        assert_equals([vin.decode('ascii') for vin in unpack_many(np.sort(packed))],
+                      sorted(vins))
+        raw = np.sort(packed.view('S12')).view(packed.dtype)
+        assert_equals([vin.decode('ascii') for vin in unpack_many(raw)], sorted(vins))
+
+    @raises(ValueError)
+    def test_illegal_char(self):
+        pack_many(['1GKEV13728J123735', '1GKEV13728J12373O'])
+
+    @raises(ValueError)
+    def test_length(self):
+        pack_many(['1GKEV13728J12373'])
+
+
+class TestMatchMany(object):
+
+    def test_same_as_match(self):
+        vins = [test['VIN'] for test in TEST_DATA]
+        for mask in ('1G', '*[A-H]', '***[^E]*1', '?????????[1-9]', vins[3]):
+            pattern = compile_mask(mask)
+            expected = [pattern.match(vin) for vin in vins]
+            assert_equals(list(match_many(pattern, vins)), expected)
+            assert_equals(list(match_many(mask, char_array(vins)[0])), expected)
+            assert_equals(list(match_many(pattern, pack_many(vins))), expected)
+
+    def test_malformed(self):
+        assert_equals(list(match_many('1G', ['1GKEV13728J12373', '1GKEV13728J12373O',
+                                             'IGKEV13728J123735'])),
+                      [False, True, False])
+
+    def test_start(self):
+        # Positions before start are taken as matching
+        vins = ['1GKEV13728J123735', '2GKEV13728J123735', '1GKEV23728J123735']
+        assert_equals(list(match_many('1GKEV1', vins, start=3)), [True, True, False])
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equals, assert_false
+
+from libvin.cli import main
+
+from . import TEST_DATA
+
+
+class TestCli(object):
+
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def read(self, name):
+        with open(os.path.join(self.dir, name)) as f:
+            return f.read()
+
+    def test_lines_to_csv(self):
+        vins = [test['VIN'] for test in TEST_DATA]
+        path = self.write('vins.txt', '\n'.join(vins) + '\n\n')
+        out = os.path.join(self.dir, 'out.csv')
+        assert_equals(main([path, '-o', out, '-f', 'vin,make,year', '-q',
+                            '--chunk-size', '7']), 0)
+        lines = self.read('out.csv').splitlines()
+        assert_equals(lines[0], 'vin,make,year')
+        assert_equals(lines[1:], ['%s,%s,%d' % (test['VIN'], test['MAKE'], test['YEAR'])
+                                  for test in TEST_DATA])
+
+    def test_csv_to_jsonl(self):
+        rows = ['id,Vin'] + ['%d,%s' % (i, test['VIN']) for i, test in enumerate(TEST_DATA)]
+        path = self.write('vins.csv', '\n'.join(rows) + '\n')
+        out = os.path.join(self.dir, 'out.jsonl')
+        assert_equals(main([path, '-o', out, '--output-format', 'jsonl',
+                            '-f', 'wmi,is_valid', '-q']), 0)
+        decoded = [json.loads(line) for line in self.read('out.jsonl').splitlines()]
+        assert_equals(decoded, [{'wmi': test['WMI'], 'is_valid': True}
+                                for test in TEST_DATA])
+
+    def test_workers(self):
+        vins = [test['VIN'] for test in TEST_DATA]
+        path = self.write('vins.txt', '\n'.join(vins * 3) + '\n')
+        for workers in ('1', '3'):
+            assert_equals(main([path, '-o', os.path.join(self.dir, workers), '-q',
+                                '--chunk-size', '10', '--workers', workers]), 0)
+        assert_equals(self.read('1'), self.read('3'))
+
+    def test_missing_column(self):
+        path = self.write('vins.csv', 'id,serial\n1,2\n')
+        assert_equals(main([path, '--column', 'vin', '-o', os.path.join(self.dir, 'out'),
+                            '-q']), 1)
+
+    def test_missing_input(self):
+        out = os.path.join(self.dir, 'out')
+        assert_equals(main([os.path.join(self.dir, 'missing.txt'), '-o', out, '-q']), 1)
+        assert_false(os.path.exists(out))
+
+    def test_unwritable_output(self):
+        path = self.write('vins.txt', TEST_DATA[0]['VIN'] + '\n')
+        assert_equals(main([path, '-o', os.path.join(self.dir, 'no', 'out'), '-q']), 1)
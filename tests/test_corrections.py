@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equals, assert_true
+
+from libvin.corrections import suggest_corrections, suggest_many
+from libvin.decoding import Vin
+
+from . import TEST_DATA
+
+VIN = '1GKEV13728J123735'
+
+
+class TestSuggestCorrections(object):
+
+    def test_valid(self):
+        assert_equals(suggest_corrections(VIN.lower()), [VIN])
+
+    def test_check_digit(self):
+        suggestions = suggest_corrections('1GKEV13758J123735')
+        assert_true(VIN in suggestions)
+        assert_true(all(Vin(s).is_valid for s in suggestions))
+        assert_true(all(sum(a != b for a, b in zip(s, '1GKEV13758J123735')) == 1
+                        for s in suggestions))
+
+    def test_ocr_confusion_first(self):
+        assert_equals(suggest_corrections('1GKEV13728J1Z3735')[0], VIN)
+        # 1 -> L is as likely a misreading as 5 -> S
+        assert_equals(suggest_corrections('1GKEV13728J12373S')[:2],
+                      ['1GKEVL3728J12373S', VIN])
+
+    def test_illegal_char(self):
+        # The I has to be the character that changes
+        assert_equals(suggest_corrections('1GKEV13728JI23735'),
+                      [VIN, '1GKEV13728JA23735', '1GKEV13728JJ23735'])
+        assert_equals(suggest_corrections('1GKEV13728JI2373Q'), [])
+        assert_true(VIN in suggest_corrections('1GKEV13728JI2373Q', max_edits=2))
+
+    def test_known_wmi(self):
+        for s in suggest_corrections('1GKEV13758J123735'):
+            assert_true(Vin(s).manufacturer != 'Unknown')
+        assert_true(len(suggest_corrections('1GKEV13758J123735', known_wmi=False)) >
+                    len(suggest_corrections('1GKEV13758J123735')))
+
+    def test_wrong_length(self):
+        assert_equals(suggest_corrections(VIN[:16]), [])
+
+    def test_many(self):
+        vins = [test['VIN'] for test in TEST_DATA]
+        damaged = [vin[:12] + ('1' if vin[12] != '1' else '2') + vin[13:] for vin in vins]
+        suggestions = suggest_many(damaged)
+        # Unless the damage happens to leave the VIN valid
+        assert_true(sum(vin in s for vin, s in zip(vins, suggestions)) > 0.8 * len(vins))
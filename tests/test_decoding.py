@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
+import threading
+
 from nose.tools import assert_equals, assert_true, raises
 
-from libvin.decoding import Vin
+from libvin.decoding import (RULE_CHECK_DIGIT, RULE_ILLEGAL_CHAR, RULE_LENGTH,
+    RULE_YEAR_CODE, Vin, VinDecoder, count_failures, decode_cache, decode_cached,
+    is_valid_vin)
 from libvin.static import *
 
 from . import TEST_DATA
@@ -52,11 +56,22 @@ class TestDecode(object):
                 # FIXME: Using requests_cache throttling would be better, wouldn't slow down cache full case.
                 sleep(0.05)
 
+    def test_brand_unknown_year(self):
+        # A Chrysler brand code, but U isn't a model year
+        v = Vin('1C3HD44AXU1234567')
+        assert_equals(v.manufacturer, 'Chrysler')
+        assert_equals(v.make, 'Chrysler')
+        assert_equals(v.country, 'United States')
+        assert_equals(v.region, 'north_america')
+
     def test_region(self):
         for test in TEST_DATA:
             v = Vin(test['VIN'])
             print "Testing: %s" % test['VIN']
             assert_equals(v.region, test['REGION'])
+        # Like country, region is 'Unknown' for an unknown first character
+        v = Vin('0GKEV13728J123735')
+        assert_equals((v.region, v.country), ('Unknown', 'Unknown'))
 
     def test_vis(self):
         for test in TEST_DATA:
@@ -88,8 +103,160 @@ class TestDecode(object):
             print "Testing: %s - %s" % (test['VIN'], v.year)
             assert_equals(v.year, test['YEAR'])
 
+    def test_wmi_info_shared(self):
+        for test in TEST_DATA:
+            v = Vin(test['VIN'])
+            w = Vin(test['VIN'][:11] + '000000')
+            print "Testing: %s" % test['VIN']
+            assert_true(v.wmi_info is w.wmi_info)
+
     def test_is_valid(self):
         for test in TEST_DATA:
             v = Vin(test['VIN'])
             print "Testing: %s" % test['VIN']
             assert_equals(v.is_valid, True)
+
+    def test_is_valid_vin(self):
+        for test in TEST_DATA:
+            vin = test['VIN']
+            assert_true(is_valid_vin(vin))
+            assert_true(is_valid_vin(vin.lower()))
+            assert_true(is_valid_vin(vin.encode('ascii')))
+            assert_true(is_valid_vin(bytearray(vin.encode('ascii'))))
+            # Wrong check digit
+            check = '0' if vin[8] != '0' else '1'
+            assert_equals(is_valid_vin(vin[:8] + check + vin[9:]), False)
+        vin = '1GKEV13728J123735'
+        assert_equals(is_valid_vin(vin[:16]), False)
+        assert_equals(is_valid_vin(vin + '5'), False)
+        for bad in 'IOQ-# ':
+            assert_equals(is_valid_vin(bad + vin[1:]), False)
+            assert_equals(Vin(bad + vin[1:]).is_valid, False)
+        # U, Z and 0 aren't model year codes; the check digits are right
+        for bad in ('1GKEV137XUJ123735', '1GKEV1370ZJ123735', '1GKEV13770J123735'):
+            assert_equals(is_valid_vin(bad), False)
+        # Only digits and X can be check digits
+        assert_equals(is_valid_vin('1GKEV137A8J123735'), False)
+
+    def test_validate(self):
+        for test in TEST_DATA:
+            result = Vin(test['VIN']).validate()
+            assert_equals(result, (0, (), test['VIN'][8]))
+            assert_true(result.valid)
+        result = Vin('1gkev13758j123735').validate()
+        assert_equals(result, (RULE_CHECK_DIGIT, (), '2'))
+        assert_equals(result.rules, ['check_digit'])
+        result = Vin('1GKEV1372UJ12373O').validate()
+        assert_equals(result.failed, RULE_ILLEGAL_CHAR | RULE_YEAR_CODE)
+        assert_equals(result.illegal_positions, (16,))
+        assert_equals(result.expected_check_digit, None)
+        # An illegal check digit is also a wrong one
+        assert_equals(Vin('1GKEV137I8J123735').validate(),
+                      (RULE_ILLEGAL_CHAR | RULE_CHECK_DIGIT, (8,), '2'))
+        assert_equals(Vin('1GKEV1372').validate(), (RULE_LENGTH, (), None))
+        assert_equals(Vin('1GKEV13728J1237350').validate().rules, ['length'])
+        assert_equals(Vin('I-KEV13728J1237350').validate().rules, ['length', 'illegal_char'])
+
+    def test_decode_cached(self):
+        decode_cache.clear()
+        for test in TEST_DATA:
+            record = decode_cached(test['VIN'].lower() + ' ')
+            v = Vin(test['VIN'])
+            for field in ('vin', 'wmi', 'vds', 'vis', 'vsn', 'squish', 'country',
+                          'manufacturer', 'make', 'year', 'is_pre_2010', 'is_valid',
+                          'less_than_500_built_per_year'):
+                assert_equals(getattr(record, field), getattr(v, field))
+            assert_true(decode_cached(test['VIN']) is record)
+        stats = decode_cache.stats()
+        assert_equals((stats.hits, stats.misses), (len(TEST_DATA), len(TEST_DATA)))
+        assert_true(decode_cache.footprint() > 0)
+        # Properties that would raise are None
+        assert_equals(decode_cached('1GKEV1372UJ123735').year, None)
+        assert_equals(decode_cached('0GKEV13728J123735').region, 'Unknown')
+        record = decode_cached('1C3HD44AXU1234567')
+        assert_equals((record.manufacturer, record.year), ('Chrysler', None))
+        assert_equals(VinDecoder().decode('1C3HD44AXU1234567'), record)
+
+    def test_decode_cached_threads(self):
+        decode_cache.clear()
+        results = []
+
+        def decode_all():
+            results.append([decode_cached(test['VIN']) for test in TEST_DATA])
+        threads = [threading.Thread(target=decode_all) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for records in results:
+            assert_true(all(a is b for a, b in zip(records, results[0])))
+        assert_equals(len(decode_cache), len(TEST_DATA))
+
+    def test_count_failures(self):
+        vins = [test['VIN'] for test in TEST_DATA]
+        vins += ['1GKEV13758J123735', '1GKEV1372UJ12373O', '1GKEV1372', '1GKEV1370ZJ123735']
+        counts = count_failures(iter(vins))
+        assert_equals(counts, {'total': len(TEST_DATA) + 4, 'valid': len(TEST_DATA),
+                               'length': 1, 'illegal_char': 1, 'year_code': 2,
+                               'check_digit': 1})
+        assert_equals(count_failures([]), {'total': 0, 'valid': 0, 'length': 0,
+                                           'illegal_char': 0, 'year_code': 0,
+                                           'check_digit': 0})
+
+
+class TestVinDecoder(object):
+
+    def test_decode(self):
+        decoder = VinDecoder()
+        for test in TEST_DATA:
+            record = decoder.decode(' ' + test['VIN'].lower())
+            assert_equals(record, decode_cached(test['VIN']))
+            assert_true(decoder.decode(test['VIN']) is record)
+        stats = decoder.stats()
+        assert_equals(stats, (len(TEST_DATA), len(TEST_DATA), 0, len(TEST_DATA), 65536))
+        assert_equals(decoder.decode_many([TEST_DATA[0]['VIN']]),
+                      [decoder.decode(TEST_DATA[0]['VIN'])])
+        decoder.clear()
+        assert_equals(decoder.stats(), (0, 0, 0, 0, 65536))
+
+    def test_validate(self):
+        decoder = VinDecoder()
+        assert_true(decoder.is_valid('1GKEV13728J123735'))
+        # Normalized as for decode()
+        assert_true(decoder.is_valid(' 1gkev13728j123735\n'))
+        assert_equals(decoder.validate('1gkev13758j123735'), (RULE_CHECK_DIGIT, (), '2'))
+
+    def test_maxsize(self):
+        decoder = VinDecoder(10, stripes=3)
+        decoder.decode_many(test['VIN'] for test in TEST_DATA)
+        assert_true(decoder.stats().size <= 10)
+
+    @raises(ValueError)
+    def test_too_many_stripes(self):
+        VinDecoder(4, stripes=8)
+
+    def test_threads(self):
+        # Small enough that the threads keep evicting each other's records
+        decoder = VinDecoder(16, stripes=4)
+        vins = [test['VIN'] for test in TEST_DATA]
+        expected = [decode_cached(vin) for vin in vins]
+        errors = []
+
+        def decode_all(seed):
+            try:
+                for i in range(200):
+                    j = (seed * 7 + i * 13) % len(vins)
+                    if decoder.decode(vins[j]) != expected[j]:
+                        errors.append(vins[j])
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=decode_all, args=(seed,)) for seed in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert_equals(errors, [])
+        stats = decoder.stats()
+        # The counters may undercount under contention
+        assert_true(0 < stats.hits + stats.misses <= 16 * 200)
+        assert_true(stats.size <= 16)
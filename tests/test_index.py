@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equals, assert_true, raises
+
+from libvin.decoding import Vin
+from libvin.index import VinIndex
+from libvin.synth import generate
+
+from . import TEST_DATA
+
+
+def _text(vins):
+    return [vin.decode('ascii') for vin in vins]
+
+
+class TestVinIndex(object):
+
+    def setup(self):
+        self.vins = [test['VIN'] for test in TEST_DATA]
+        self.index = VinIndex.build(self.vins)
+
+    def test_all(self):
+        assert_equals(len(self.index), len(self.vins))
+        assert_equals(_text(self.index.find()), sorted(self.vins))
+
+    def test_prefix(self):
+        for test in TEST_DATA:
+            wmi = test['WMI']
+            expected = sorted(vin for vin in self.vins if vin.startswith(wmi))
+            assert_equals(_text(self.index.find(wmi.lower())), expected)
+            assert_equals(self.index.count(wmi), len(expected))
+        assert_equals(self.index.count(self.vins[0]), 1)
+        assert_equals(self.index.count('ZZZ'), 0)
+
+    def test_wildcard(self):
+        expected = sorted(vin for vin in self.vins if vin[1:3] == 'D7' and vin[4] == 'B')
+        assert_equals(len(expected), 2)
+        assert_equals(_text(self.index.find('?D7?B')), expected)
+        expected = sorted(vin for vin in self.vins if vin[0] in '1234' and vin[1] != 'G')
+        assert_equals(_text(self.index.find('[1-4][^G]')), expected)
+
+    def test_years(self):
+        for year in (1999, 2008, 2013):
+            expected = sorted(vin for vin in self.vins if Vin(vin).year == year)
+            assert_equals(_text(self.index.find(first_year=year, last_year=year)), expected)
+        expected = sorted(vin for vin in self.vins
+                          if vin.startswith('1G') and Vin(vin).year >= 2010)
+        assert_equals(_text(self.index.find('1G', first_year=2010)), expected)
+
+    def test_synthetic(self):
+        vins, _ = generate(20000, seed=5)
+        vins = _text(vins)
+        index = VinIndex.build(vins)
+        wmi = vins[0][:3]
+        expected = sorted(vin for vin in vins if vin.startswith(wmi) and vin[7] == '4'
+                          and 1995 <= Vin(vin).year <= 2012)
+        assert_equals(_text(index.find(wmi + '????4', 1995, 2012)), expected)
+
+    def test_contains(self):
+        assert_true(self.vins[0] in self.index)
+        assert_true(self.vins[0].lower() in self.index)
+        assert_true('ZZZZZZZZZZZZZZZZZ' not in self.index)
+        assert_true(self.vins[0][:3] not in self.index)
+        assert_true('1GKEV13728J12373O' not in self.index)
+
+    def test_save_load(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'index.npy')
+            self.index.save(path)
+            for mmap in (True, False):
+                loaded = VinIndex.load(path, mmap=mmap)
+                assert_equals(_text(loaded.find('1G', 2008)), _text(self.index.find('1G', 2008)))
+                del loaded
+        finally:
+            shutil.rmtree(tmp)
+
+    @raises(ValueError)
+    def test_bad_pattern(self):
+        self.index.find('1GO')
+
+    @raises(ValueError)
+    def test_bad_vin(self):
+        VinIndex.build(['1GKEV13728J12373'])
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equals, assert_true, raises
+
+from libvin.lru import LRUCache
+
+
+class TestLRUCache(object):
+
+    def test_hits_and_misses(self):
+        cache = LRUCache(4)
+        assert_equals(cache.get('a'), None)
+        assert_equals(cache.put('a', 1), 1)
+        assert_equals(cache.get('a'), 1)
+        # Existing entries keep their value
+        assert_equals(cache.put('a', 2), 1)
+        stats = cache.stats()
+        assert_equals((stats.hits, stats.misses, stats.evictions, stats.size),
+                      (1, 1, 0, 1))
+        assert_equals(stats.hit_ratio, 0.5)
+        assert_equals(LRUCache().stats().hit_ratio, 0.0)
+
+    def test_footprint(self):
+        cache = LRUCache(4)
+        empty = cache.footprint()
+        cache.put('a', 'x' * 1000)
+        assert_true(cache.footprint() > empty + 1000)
+        assert_equals(cache.footprint(lambda obj: 0), cache.footprint(lambda obj: 1) - 2)
+
+    def test_evicts_unused(self):
+        cache = LRUCache(3)
+        for key in 'abc':
+            cache.put(key, key)
+        # One sweep clears every flag, then evicts the oldest
+        cache.put('d', 'd')
+        assert_true('a' not in cache)
+        # b was read since the sweep, so c goes next
+        cache.get('b')
+        cache.put('e', 'e')
+        assert_equals(sorted(cache._entries), ['b', 'd', 'e'])
+        assert_equals(cache.stats().evictions, 2)
+        assert_equals(len(cache), 3)
+
+    def test_clear(self):
+        cache = LRUCache(2)
+        for key in 'abc':
+            cache.put(key, key)
+        cache.clear()
+        assert_equals(len(cache), 0)
+        assert_equals(cache.stats(), (0, 0, 0, 0, 2))
+
+    @raises(ValueError)
+    def test_maxsize(self):
+        LRUCache(0)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from nose.tools import assert_equals, assert_true, raises
+
+from libvin.mapped import MappedWmiTable, main
+from libvin.tables import compile_countries, compile_regions, compile_wmis
+
+from . import TEST_DATA
+
+
+class TestMappedWmiTable(object):
+
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'wmi.table')
+        assert_equals(main([self.path]), 0)
+        self.table = MappedWmiTable(self.path)
+
+    def teardown(self):
+        self.table.close()
+        shutil.rmtree(self.dir)
+
+    def test_same_as_compiled(self):
+        wmis = compile_wmis()
+        assert_equals(len(self.table), len(wmis))
+        for wmi, entry in wmis.items():
+            assert_equals(self.table[wmi], entry)
+
+    def test_countries_and_regions(self):
+        for mapped, names in ((self.table.countries, compile_countries()),
+                              (self.table.regions, compile_regions())):
+            assert_equals(len(mapped), len(names))
+            for code, name in names.items():
+                assert_equals(mapped[code], name)
+        assert_true(self.table.countries.get('I1') is None)
+        assert_equals(self.table.regions.get('I', 'Unknown'), 'Unknown')
+
+    def test_missing(self):
+        for wmi in ['', 'Z', 'ZZZ', 'JHMX', u'J\xe9M']:
+            assert_true(self.table.get(wmi) is None)
+            assert_true(wmi not in self.table)
+
+    @raises(KeyError)
+    def test_key_error(self):
+        self.table['ZZZ']
+
+    @raises(ValueError)
+    def test_not_a_table(self):
+        MappedWmiTable(os.path.join(os.path.dirname(__file__), 'data', 'vpic_sample.csv'))
+
+    @raises(ValueError)
+    def test_out_of_date(self):
+        # As if written from a different libvin/static.py
+        with open(self.path, 'r+b') as f:
+            f.seek(20)
+            f.write(b'\0\0\0\0')
+        MappedWmiTable(self.path)
+
+    def _run(self, path):
+        # Decodes the test VINs in a fresh interpreter with LIBVIN_TABLES=path
+        env = dict(os.environ, LIBVIN_TABLES=path)
+        code = ("import sys, warnings\n"
+                "warnings.simplefilter('always')\n"
+                "from libvin.decoding import Vin\n"
+                "from libvin.tables import WMIS\n"
+                "sys.stdout.write(type(WMIS).__name__ + '\\n')\n"
+                "for v in sys.argv[1:]:\n"
+                "    sys.stdout.write('%s %s\\n' % (Vin(v).make, Vin(v).country))\n")
+        vins = [test['VIN'] for test in TEST_DATA]
+        process = subprocess.Popen([sys.executable, '-c', code] + vins, env=env,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   cwd=os.path.join(os.path.dirname(__file__), '..'))
+        output, errors = process.communicate()
+        assert_equals(process.returncode, 0)
+        lines = output.decode('ascii').splitlines()
+        assert_equals(lines[1:], ['%s %s' % (test['MAKE'], test['COUNTRY'])
+                                  for test in TEST_DATA])
+        return lines[0], errors.decode('ascii')
+
+    def test_environment(self):
+        # A fresh interpreter picks the tables up from LIBVIN_TABLES
+        assert_equals(self._run(self.path)[0], 'MappedWmiTable')
+
+    def test_environment_out_of_date(self):
+        with open(self.path, 'r+b') as f:
+            f.seek(20)
+            f.write(b'\0\0\0\0')
+        tables, errors = self._run(self.path)
+        assert_equals(tables, 'dict')
+        assert_true('out of date' in errors)
+
+    def test_environment_missing(self):
+        tables, errors = self._run(os.path.join(self.dir, 'missing.table'))
+        assert_equals(tables, 'dict')
+        assert_true('missing.table' in errors)
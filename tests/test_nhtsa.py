@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+import time
+
+from nose.tools import assert_equals, assert_true
+
+from libvin.nhtsa import NhtsaClient, BATCH_SIZE
+
+from . import TEST_DATA
+from .nhtsa_stub import StubServer
+
+
+class TestNhtsaClient(object):
+
+    def setup(self):
+        self.server = StubServer()
+        self.client = NhtsaClient(self.server.url, timeout=5, workers=3)
+
+    def teardown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_decode(self):
+        for test in TEST_DATA[:5]:
+            n = self.client.decode(test['VIN'])
+            assert_equals(n['Make'], test['MAKE'].upper())
+            assert_equals(n['ModelYear'], str(test['YEAR']))
+        assert_equals(self.client.requests_made, 5)
+
+    def test_decode_batch(self):
+        vins = [test['VIN'] for test in TEST_DATA] * 2
+        results = self.client.decode_batch(vins)
+        assert_equals([n['VIN'] for n in results], vins)
+        assert_equals([n['Make'] for n in results],
+                      [test['MAKE'].upper() for test in TEST_DATA] * 2)
+        # Each distinct VIN is fetched once
+        batches = (len(TEST_DATA) + BATCH_SIZE - 1) // BATCH_SIZE
+        assert_equals(self.client.requests_made, batches)
+        assert_equals(len(self.server.paths), batches)
+        assert_equals(self.client.lookups_saved, len(TEST_DATA))
+        assert_true(results[0] is not results[len(TEST_DATA)])
+
+    def test_decode_batch_by_pattern(self):
+        # Same model, plant and year; different serials
+        vins = ['1G1ZT58N77F242411', '1G1ZT58N97F183264', '1G1ZT58N07F183264']
+        client = NhtsaClient(self.server.url, by_pattern=True)
+        results = client.decode_batch(vins)
+        client.close()
+        assert_equals([n['VIN'] for n in results], vins)
+        # The last has a bad check digit, so is looked up separately
+        assert_equals(self.server.paths, ['/api/vehicles/DecodeVINValuesBatch/'])
+        assert_equals(client.lookups_saved, 1)
+
+    def test_connection_failed(self):
+        client = NhtsaClient('http://127.0.0.1:1/', timeout=1, retries=0)
+        assert_true(client.decode(TEST_DATA[0]['VIN']) is None)
+        assert_equals(client.decode_batch([TEST_DATA[0]['VIN']]), [None])
+        client.close()
+
+    def test_rate_limit(self):
+        client = NhtsaClient(self.server.url, max_per_second=20)
+        start = time.time()
+        for test in TEST_DATA[:5]:
+            client.decode(test['VIN'])
+        client.close()
+        assert_true(time.time() - start >= 0.2)
+
+    def test_retries(self):
+        server = StubServer(failures=2)
+        client = NhtsaClient(server.url, retries=2, max_per_second=10)
+        client.backoff_factor = 0
+        start = time.time()
+        n = client.decode(TEST_DATA[0]['VIN'])
+        elapsed = time.time() - start
+        # Retries are made, counted and rate limited like any request
+        assert_equals(n['Make'], TEST_DATA[0]['MAKE'].upper())
+        assert_equals(client.requests_made, 3)
+        assert_equals(len(server.paths), 3)
+        assert_true(elapsed >= 0.2)
+        # And given up on after retries of them
+        server.failures = 6
+        assert_equals(client.decode_batch([TEST_DATA[1]['VIN']]), [None])
+        assert_equals(len(server.paths), 6)
+        client.close()
+        server.stop()
+
+
+class TestLazyImport(object):
+
+    def test_offline_import(self):
+        # Offline decoding doesn't import requests; checked in a fresh
+        # interpreter, as this one may have imported it already
+        code = ("import sys, libvin, libvin.snapshot\n"
+                "from libvin.decoding import Vin\n"
+                "Vin('1GKEV13728J123735').make\n"
+                "sys.stdout.write(str('requests' in sys.modules))\n")
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         cwd=os.path.join(os.path.dirname(__file__), '..'))
+        assert_equals(output.decode('ascii'), 'False')
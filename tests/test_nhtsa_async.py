@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import sys
+
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_equals, assert_true
+
+if sys.version_info < (3, 6):
+    raise SkipTest("libvin.nhtsa_async needs Python 3.6 or later")
+
+import asyncio
+import threading
+
+from libvin.nhtsa import BATCH_SIZE
+from libvin.nhtsa_async import AsyncNhtsaClient
+from libvin.nhtsa_cache import NhtsaCache
+
+from . import TEST_DATA
+from .nhtsa_stub import StubServer
+
+
+class TestAsyncNhtsaClient(object):
+
+    def setup(self):
+        self.server = StubServer()
+        self.client = AsyncNhtsaClient(concurrency=4, timeout=5, base_url=self.server.url)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def teardown(self):
+        self.client.close()
+        asyncio.set_event_loop(None)
+        self.loop.close()
+        self.server.stop()
+
+    def run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_decode(self):
+        vins = [test['VIN'] for test in TEST_DATA[:8]]
+        results = self.run(asyncio.gather(*[self.client.decode(vin) for vin in vins]))
+        assert_equals([n['Make'] for n in results],
+                      [test['MAKE'].upper() for test in TEST_DATA[:8]])
+
+    def test_decode_batch(self):
+        vins = [test['VIN'] for test in TEST_DATA] * 2
+        results = self.run(self.client.decode_batch(vins))
+        assert_equals([n['VIN'] for n in results], vins)
+        # Each distinct VIN is fetched once
+        assert_equals(len(self.server.paths), 2)
+        assert_equals(self.client.client.lookups_saved, len(TEST_DATA))
+
+    def test_timeout(self):
+        self.server.delay = 1
+        self.client.timeout = 0.1
+        assert_true(self.run(self.client.decode(TEST_DATA[0]['VIN'])) is None)
+
+    def test_timeout_keeps_place(self):
+        # Lookups that time out still count towards concurrency until
+        # their threads are done
+        self.client.timeout = 0.1
+        done = threading.Event()
+        started = []
+
+        def lookup(n):
+            started.append(n)
+            done.wait(5)
+            return n
+
+        results = self.run(asyncio.gather(*[self.client._call(lookup, n) for n in range(4)]))
+        assert_equals(results, [None] * 4)
+        task = self.loop.create_task(self.client._call(lookup, 4))
+        self.run(asyncio.sleep(0.3))
+        assert_equals(sorted(started), [0, 1, 2, 3])
+        done.set()
+        assert_equals(self.run(task), 4)
+
+    def test_cancel(self):
+        self.server.delay = 1
+        task = self.loop.create_task(self.client.decode(TEST_DATA[0]['VIN']))
+        self.loop.call_later(0.1, task.cancel)
+        try:
+            self.run(task)
+        except asyncio.CancelledError:
+            pass
+        assert_true(task.cancelled())
+
+    def test_cache(self):
+        self.client.client.cache = NhtsaCache()
+        vins = [test['VIN'] for test in TEST_DATA[:BATCH_SIZE + 1]]
+        self.run(self.client.decode(vins[3]))
+        results = self.run(self.client.decode_batch(vins))
+        assert_equals([n['VIN'] for n in results], vins)
+        assert_equals(len(self.server.paths), 2)
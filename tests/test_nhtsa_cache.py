@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import time
+
+from nose.tools import assert_equals, assert_true
+
+from libvin.nhtsa import BATCH_SIZE, NhtsaClient
+from libvin.nhtsa_cache import NhtsaCache
+
+from . import TEST_DATA
+from .nhtsa_stub import StubServer, stub_result
+
+
+class TestNhtsaCache(object):
+
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'vpic.sqlite')
+
+    def teardown(self):
+        shutil.rmtree(self.dir)
+
+    def test_get_put(self):
+        vin = TEST_DATA[0]['VIN']
+        with NhtsaCache(self.path) as cache:
+            assert_true(cache.get(vin) is None)
+            cache.put(vin, stub_result(vin))
+            assert_equals(cache.get(vin.lower())['Make'], stub_result(vin)['Make'])
+            stats = cache.stats()
+            assert_equals((stats.hits, stats.misses, stats.size), (1, 1, 1))
+        # Survives reopening
+        with NhtsaCache(self.path) as cache:
+            assert_equals(cache.get(vin), stub_result(vin))
+
+    def test_ttl(self):
+        vin = TEST_DATA[0]['VIN']
+        cache = NhtsaCache(ttl=0.05)
+        cache.put(vin, stub_result(vin))
+        assert_true(cache.get(vin) is not None)
+        time.sleep(0.1)
+        assert_true(cache.get(vin) is None)
+        assert_equals(len(cache), 0)
+
+    def test_evicts_least_recently_used(self):
+        vins = [test['VIN'] for test in TEST_DATA[:4]]
+        cache = NhtsaCache(maxsize=3)
+        for vin in vins[:3]:
+            cache.put(vin, stub_result(vin))
+            time.sleep(0.01)
+        cache.get(vins[0])
+        cache.put(vins[3], stub_result(vins[3]))
+        assert_equals([result is not None for result in cache.get_many(vins)],
+                      [True, False, True, True])
+        assert_equals(cache.stats().evictions, 1)
+
+    def test_size(self):
+        # Kept as entries come and go, without counting the table
+        vins = [test['VIN'] for test in TEST_DATA[:4]]
+        with NhtsaCache(self.path, maxsize=3) as cache:
+            cache.put(vins[0], stub_result(vins[0]))
+            cache.put_many([(vin, stub_result(vin)) for vin in vins[:2] + vins[1:2]])
+            assert_equals(len(cache), 2)
+            assert_equals(cache.get(vins[1]), stub_result(vins[1]))
+            cache.put_many([(vin, stub_result(vin)) for vin in vins])
+            assert_equals((len(cache), cache.stats().evictions), (3, 1))
+            assert_equals(cache.purge(), 0)
+            assert_equals(len(cache), 3)
+        with NhtsaCache(self.path, maxsize=3) as cache:
+            assert_equals(len(cache), 3)
+            cache.clear()
+            assert_equals(len(cache), 0)
+
+    def test_by_pattern(self):
+        # Same model, plant and year; different serial and check digit
+        vin, other = '1G1ZT58N77F242411', '1G1ZT58N97F183264'
+        cache = NhtsaCache(by_pattern=True)
+        assert_equals(cache.key(vin), cache.key(other))
+        cache.put(vin, stub_result(vin))
+        assert_equals(cache.get(other)['VIN'], other)
+        # VINs with a bad check digit are cached individually
+        assert_equals(cache.key('1G1ZT58N07F183264'), '1G1ZT58N07F183264')
+
+
+class TestCachedClient(object):
+
+    def setup(self):
+        self.server = StubServer()
+        self.client = NhtsaClient(self.server.url, cache=NhtsaCache())
+
+    def teardown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_decode(self):
+        vin = TEST_DATA[0]['VIN']
+        assert_equals(self.client.decode(vin), self.client.decode(vin))
+        assert_equals(self.client.requests_made, 1)
+
+    def test_decode_batch(self):
+        vins = [test['VIN'] for test in TEST_DATA[:BATCH_SIZE + 1]]
+        self.client.decode(vins[1])
+        results = self.client.decode_batch(vins)
+        assert_equals([n['VIN'] for n in results], vins)
+        assert_equals(self.client.requests_made, 2)
+        assert_equals(self.client.decode_batch(vins), results)
+        assert_equals(self.client.requests_made, 2)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equals, assert_true, raises
+
+from libvin.packing import (PACKED_BYTES, pack_vin, pack_vin_bytes, unpack_vin,
+    unpack_vin_bytes)
+
+from . import TEST_DATA
+
+
+class TestPacking(object):
+
+    def test_round_trip(self):
+        for test in TEST_DATA:
+            vin = test['VIN']
+            assert_equals(unpack_vin(pack_vin(vin)), vin)
+            assert_equals(unpack_vin_bytes(pack_vin_bytes(vin)), vin)
+            assert_equals(len(pack_vin_bytes(vin)), PACKED_BYTES)
+            assert_equals(pack_vin(vin.lower()), pack_vin(vin))
+            assert_equals(pack_vin(vin.encode('ascii')), pack_vin(vin))
+
+    def test_range(self):
+        assert_equals(pack_vin('00000000000000000'), 0)
+        assert_equals(pack_vin('ZZZZZZZZZZZZZZZZZ'), 33 ** 17 - 1)
+        assert_equals(pack_vin_bytes('ZZZZZZZZZZZZZZZZZ')[:1], b'\x35')
+
+    def test_sort_order(self):
+        vins = sorted(test['VIN'] for test in TEST_DATA)
+        assert_equals(sorted(vins, key=pack_vin), vins)
+        assert_equals(sorted(vins, key=pack_vin_bytes), vins)
+
+    @raises(ValueError)
+    def test_illegal_char(self):
+        pack_vin('1GKEV13728J12373O')
+
+    @raises(ValueError)
+    def test_length(self):
+        pack_vin('1GKEV13728J12373')
+
+    @raises(ValueError)
+    def test_unpack_range(self):
+        unpack_vin(33 ** 17)
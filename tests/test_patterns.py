@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equals, assert_true, raises
+
+from libvin.patterns import ALL, PatternSet, compile_mask
+
+from . import TEST_DATA
+
+VIN = '1GKEV13728J123735'
+
+
+class TestVinPattern(object):
+
+    def test_compile(self):
+        pattern = compile_mask('1G*[A-C][^0-8X]')
+        assert_equals(pattern.bits[0], 1 << 1)
+        assert_equals(pattern.bits[2], ALL)
+        # A, B and C are the 11th to 13th characters
+        assert_equals(pattern.bits[3], 0b111 << 10)
+        assert_equals(bin(pattern.bits[4]).count('1'), 33 - 10)
+        assert_equals(pattern.bits[5:], (ALL,) * 12)
+        assert_equals([position for position, bits in pattern.checks], [0, 1, 3, 4])
+
+    def test_match(self):
+        for mask in ('', '1GK', '1GKEV1*7*8J', '1gk?v1[2-4]7', VIN, '[^2]', '*' * 17):
+            assert_true(compile_mask(mask).match(VIN), mask)
+        for mask in ('2GK', '1GKEV1*8', '[^1]', VIN[:16] + '6'):
+            assert_equals(compile_mask(mask).match(VIN), False, mask)
+        pattern = compile_mask('1GK')
+        assert_true(pattern.match(VIN.lower()))
+        assert_true(pattern.match(VIN.encode('ascii')))
+        assert_equals(pattern.match(VIN[:16]), False)
+        # Only the positions the mask restricts are looked at
+        assert_equals(compile_mask('****V').match('1GKEI13728J123735'), False)
+
+    def test_prefix(self):
+        assert_equals(compile_mask('1GK*V1').prefix(), '1GK')
+        assert_equals(compile_mask('1G[K]E[VW]').prefix(), '1GKE')
+        assert_equals(compile_mask('*').prefix(), '')
+
+    def test_errors(self):
+        for mask in ('1GO', '[A', '[]', '[Z-A]', '[A-I]', 'A' * 18):
+            try:
+                compile_mask(mask)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("%r compiled" % mask)
+
+
+class TestPatternSet(object):
+
+    def test_match(self):
+        masks = ['1GK', '1G[A-K]EV1*7', '2*', '*****[0-3]', VIN, '[^1]']
+        patterns = PatternSet(masks)
+        assert_equals(len(patterns), len(masks))
+        assert_equals(patterns.match(VIN), [0, 1, 3, 4])
+        assert_equals(patterns.match(VIN.lower()), [0, 1, 3, 4])
+        assert_equals(patterns.match('2GKEV13738J123735'), [2, 3, 5])
+        assert_equals(patterns.match(VIN[:16]), [])
+        # I is no VIN character, but '*****[0-3]' doesn't look at it
+        assert_equals(patterns.match('IGKEV13728J123735'), [3])
+
+    def test_same_as_each(self):
+        masks = [test['VIN'][:3] + '*' + test['VIN'][4:8] for test in TEST_DATA]
+        masks += ['*' * 9 + test['VIN'][9] for test in TEST_DATA]
+        patterns = PatternSet(masks)
+        compiled = [compile_mask(mask) for mask in masks]
+        for test in TEST_DATA:
+            assert_equals(patterns.match(test['VIN']),
+                          [i for i, pattern in enumerate(compiled) if pattern.match(test['VIN'])])
+        assert_equals(PatternSet([]).match(VIN), [])
+        # Not a VIN character, where only some of the patterns look
+        odd = '1GKEVI3728J123735'
+        masks = ['1GK', '*****[0-3]', '1GKEV[^Z]']
+        assert_equals(PatternSet(masks).match(odd),
+                      [i for i, mask in enumerate(masks) if compile_mask(mask).match(odd)])
+        assert_equals(PatternSet(masks).match(odd), [0])
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equals, assert_true, raises
+
+from libvin.snapshot import VpicSnapshot, main
+
+SAMPLE = os.path.join(os.path.dirname(__file__), 'data', 'vpic_sample.csv')
+
+
+class TestSnapshot(object):
+
+    def setup(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'vpic.sqlite')
+        assert_equals(main([SAMPLE, self.path]), 0)
+        self.snapshot = VpicSnapshot(self.path)
+
+    def teardown(self):
+        self.snapshot.close()
+        shutil.rmtree(self.dir)
+
+    def test_decode(self):
+        n = self.snapshot.decode('1GKEV13728J123735')
+        assert_equals((n['Make'], n['Model'], n['ModelYear'], n['ErrorCode']),
+                      ('GMC', 'Acadia', '2008', '0'))
+        # Empty fields are kept
+        assert_equals(n['Trim'], '')
+        assert_equals(len(self.snapshot), 12)
+
+    def test_same_pattern(self):
+        # Another serial number from the same model, plant and year
+        n = self.snapshot.decode('1GKEV13748J987654')
+        assert_equals((n['VIN'], n['Model']), ('1GKEV13748J987654', 'Acadia'))
+
+    def test_unknown(self):
+        assert_equals(self.snapshot.decode_batch(['5GNRNGEE9A8215904', '1GKEV13728J123735'])[0],
+                      None)
+
+    def test_jsonl(self):
+        path = os.path.join(self.dir, 'results.jsonl')
+        with open(path, 'w') as f:
+            f.write(json.dumps({'VIN': '5GNRNGEE9A8215904', 'Make': 'CHEVROLET'}) + '\n')
+        assert_equals(main([path, os.path.join(self.dir, 'other.sqlite')]), 0)
+        with VpicSnapshot(os.path.join(self.dir, 'other.sqlite')) as snapshot:
+            assert_equals(snapshot.decode('5GNRNGEE9A8215904')['Make'], 'CHEVROLET')
+
+    def test_no_vin_field(self):
+        path = os.path.join(self.dir, 'bad.csv')
+        with open(path, 'w') as f:
+            f.write('Make,Model\nGMC,Acadia\n')
+        assert_true(main([path, os.path.join(self.dir, 'other.sqlite')]) != 0)
+        # Nothing is left behind
+        assert_equals(sorted(os.listdir(self.dir)), ['bad.csv', 'vpic.sqlite'])
+
+    def test_empty(self):
+        path = os.path.join(self.dir, 'empty.jsonl')
+        open(path, 'w').close()
+        assert_true(main([path, self.path]) != 0)
+        # The existing snapshot is untouched
+        with VpicSnapshot(self.path) as snapshot:
+            assert_equals(len(snapshot), 12)
+
+    def test_rebuild(self):
+        # Building over an existing snapshot replaces it
+        path = os.path.join(self.dir, 'results.jsonl')
+        with open(path, 'w') as f:
+            f.write(json.dumps({'VIN': '5GNRNGEE9A8215904', 'Make': 'CHEVROLET'}) + '\n')
+        assert_equals(main([path, self.path]), 0)
+        with VpicSnapshot(self.path) as snapshot:
+            assert_equals(len(snapshot), 1)
+
+    def test_missing(self):
+        path = os.path.join(self.dir, 'missing.sqlite')
+        try:
+            VpicSnapshot(path)
+        except IOError as e:
+            assert_true(path in str(e))
+        else:
+            raise AssertionError("opened a missing snapshot")
+        # ... without creating it
+        assert_true(not os.path.exists(path))
+
+    @raises(ValueError)
+    def test_not_a_snapshot(self):
+        VpicSnapshot(SAMPLE)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import io
+
+from nose.tools import assert_equals, assert_true, raises
+
+from libvin.batch import REASON_CHECK_DIGIT, REASON_OK, validate_many
+from libvin.decoding import Vin
+from libvin.synth import generate, generate_chunks, write_vins
+
+
+class TestSynth(object):
+
+    def test_valid(self):
+        vins, labels = generate(2000, seed=1)
+        assert_true((labels == REASON_OK).all())
+        assert_true(all(Vin(vin.decode('ascii')).is_valid for vin in vins.tolist()))
+
+    def test_repeatable(self):
+        first, _ = generate(100, seed=7, invalid=0.5)
+        second, _ = generate(100, seed=7, invalid=0.5)
+        assert_equals(first.tolist(), second.tolist())
+
+    def test_labels(self):
+        vins, labels = generate(20000, seed=2, invalid=0.3)
+        valid, reasons = validate_many(vins.tolist())
+        assert_equals(reasons.tolist(), labels.tolist())
+        assert_true(0.25 < 1 - valid.mean() < 0.35)
+
+    def test_defects(self):
+        _, labels = generate(1000, seed=3, invalid=1, defects=[REASON_CHECK_DIGIT])
+        assert_true((labels == REASON_CHECK_DIGIT).all())
+
+    def test_distributions(self):
+        vins, _ = generate(500, seed=4, wmis={'1GK': 1, 'JH4': 3}, years=[2008, 2014])
+        decoded = [Vin(vin.decode('ascii')) for vin in vins.tolist()]
+        assert_equals(set(v.make for v in decoded), set(['GMC', 'Acura']))
+        assert_equals(set(v.year for v in decoded), set([2008, 2014]))
+        assert_true(sum(v.make == 'Acura' for v in decoded) > 300)
+
+    @raises(ValueError)
+    def test_bad_wmi(self):
+        generate(10, wmis=['1GI'])
+
+    @raises(ValueError)
+    def test_bad_year(self):
+        generate(10, years=[1979])
+
+    def test_write(self):
+        out = io.BytesIO()
+        write_vins(out, 2500, labels=True, chunk_size=1000, seed=5, invalid=0.1)
+        lines = out.getvalue().decode('ascii').splitlines()
+        assert_equals(len(lines), 2500)
+        assert_true(all(len(line.split(',')) == 2 for line in lines))
+        assert_equals(sum(len(vins) for vins, _ in generate_chunks(2500, 1000)), 2500)